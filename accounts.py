@@ -0,0 +1,97 @@
+"""Name-and-passphrase accounts on top of the per-user store.
+
+An account maps a user name to a random user id, which is what saved data
+is keyed by, so the passphrase never becomes the identity: two people with
+the same passphrase still get separate accounts, and changing a passphrase
+would not move any data. Only a salted scrypt verifier of the passphrase is
+stored. Failed sign-ins are counted per account name in this process, and
+after max_failures the name is locked for lockout_seconds, doubling with
+each further lockout.
+"""
+import hashlib
+import hmac
+import os
+import re
+import threading
+import time
+import uuid
+
+_NAME = re.compile(r"[a-z0-9_.-]{3,32}")
+# Saved under this pseudo user id, which can never be a real one (those are hex)
+_ACCOUNT_PREFIX = "account:"
+
+
+class AccountError(Exception):
+    pass
+
+
+def normalize_name(name):
+    return name.strip().lower()
+
+
+class AccountStore:
+    def __init__(self, store, max_failures=5, lockout_seconds=60.0, min_passphrase=8, scrypt_n=2 ** 14,
+                 clock=time.monotonic):
+        self.store = store
+        self.max_failures = max_failures
+        self.lockout_seconds = lockout_seconds
+        self.min_passphrase = min_passphrase
+        self.scrypt_n = scrypt_n
+        self._clock = clock
+        self._failures = {}  # name -> [failures since the last lockout, lockouts, locked until]
+        self._lock = threading.Lock()
+        self._stats = {"registered": 0, "signed_in": 0, "failed": 0, "locked_out": 0}
+
+    def _hash(self, passphrase, salt):
+        return hashlib.scrypt(passphrase.encode(), salt=salt, n=self.scrypt_n, r=8, p=1, dklen=32)
+
+    def register(self, name, passphrase):
+        """Create an account and return its new user id; raises AccountError if that is not possible."""
+        name = normalize_name(name)
+        if not _NAME.fullmatch(name):
+            raise AccountError("Names are 3-32 letters, digits, '.', '_' or '-'.")
+        if len(passphrase) < self.min_passphrase:
+            raise AccountError(f"Use a passphrase of at least {self.min_passphrase} characters.")
+        salt = os.urandom(16)
+        record = {"user_id": uuid.uuid4().hex, "salt": salt.hex(), "verifier": self._hash(passphrase, salt).hex()}
+        with self._lock:
+            if self.store.get(_ACCOUNT_PREFIX + name, "credentials") is not None:
+                raise AccountError("That name is taken.")
+            self.store.put(_ACCOUNT_PREFIX + name, "credentials", record)
+            self._stats["registered"] += 1
+        # Write the account now rather than with the next batch
+        self.store.flush()
+        return record["user_id"]
+
+    def sign_in(self, name, passphrase):
+        """Return the account's user id; raises AccountError on a wrong name or passphrase, or while locked."""
+        name = normalize_name(name)
+        with self._lock:
+            entry = self._failures.get(name)
+            if entry and entry[2] > self._clock():
+                raise AccountError(f"Too many attempts; try again in {entry[2] - self._clock():.0f} s.")
+        record = self.store.get(_ACCOUNT_PREFIX + name, "credentials")
+        # Hash even for unknown names so timing does not reveal which names exist
+        salt = bytes.fromhex(record["salt"]) if record else b"\0" * 16
+        verifier = self._hash(passphrase, salt)
+        if record and hmac.compare_digest(verifier, bytes.fromhex(record["verifier"])):
+            with self._lock:
+                self._failures.pop(name, None)
+                self._stats["signed_in"] += 1
+            return record["user_id"]
+
+        with self._lock:
+            self._stats["failed"] += 1
+            entry = self._failures.setdefault(name, [0, 0, 0.0])
+            entry[0] += 1
+            if entry[0] >= self.max_failures:
+                entry[0] = 0
+                entry[2] = self._clock() + self.lockout_seconds * 2 ** entry[1]
+                entry[1] += 1
+                self._stats["locked_out"] += 1
+        raise AccountError("Wrong name or passphrase.")
+
+    def stats(self):
+        with self._lock:
+            now = self._clock()
+            return {**self._stats, "locked_names": sum(1 for *_, until in self._failures.values() if until > now)}
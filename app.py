@@ -2,32 +2,358 @@
 import os
 from dotenv import load_dotenv
 import streamlit as st
+import streamlit.components.v1 as components
 import speech_recognition as sr
 from clarifai_grpc.channel.clarifai_channel import ClarifaiChannel
 from clarifai_grpc.grpc.api import resources_pb2, service_pb2, service_pb2_grpc
 from clarifai_grpc.grpc.api.status import status_code_pb2
 from gtts import gTTS
 from streamlit_drawable_canvas import st_canvas
-from datetime import datetime
+from datetime import datetime, timedelta
 import random
+import re
 import time
-import requests
-import numpy as np
+import uuid
 from scipy.io import wavfile
 import io
 from pathlib import Path
-import sounddevice as sd
 import google.generativeai as genai
-import pyttsx3
-import wave
 import plotly.graph_objects as go
-import pandas as pd
-from threading import Thread
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from accounts import AccountError, AccountStore
+from audio_assets import AudioLibrary
+from audio_capture import AudioCapture, MicrophoneSource, SyntheticSource, pcm16_wav_buffer
+from breathing import BREATHING_EXERCISES
+from conversation import ConversationStore, estimate_tokens
+from image_cache import ImageCache
+from journal_store import JournalStore
+from meme_prefetch import MemePrefetcher, MemeUnavailable
+from model_client import AsyncModelClient, ClarifaiProvider, HttpProvider, ModelProvider
+from mood_store import MoodStore
+from page_router import PageRouter
+from profiling import default_profiler, timed
+from paginated_list import list_page_fetcher, paginated_list
+from resources import ResourceRegistry
+from vad import EndpointDetector, trim_silence
+from response_cache import ResponseCache
+from speech_backends import create_backend
+from sleep_stats import QUALITY_LEVELS, SleepStats
+from soundscape import Soundscape
+from speech_pipeline import SpeechPipeline
+from strokes import StrokeLog
+from state_profiler import FootprintRegistry, suggest_compaction
+from streaming import FakeStreamingModel, StreamStats, iter_text_chunks
+from transcription_cache import TranscriptionCache, audio_fingerprint
+from tts_worker import GTTSSynthesizer, Pyttsx3Synthesizer, TTSWorkerPool
+from user_store import SQLiteBackend, UserStore
 
 def configure():
     load_dotenv()
 
 
+def get_setting(name, default=None):
+    """Read a setting from the environment, falling back to Streamlit secrets."""
+    value = os.getenv(name)
+    if value is None:
+        try:
+            value = st.secrets.get(name)
+        except FileNotFoundError:
+            value = None
+    return default if value is None else value
+
+
+def get_session_id():
+    """Return the id of the Streamlit session running this script."""
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else "default"
+
+
+def get_user_id():
+    """Return a stable id for this user, so saved data survives new sessions.
+
+    By default the id is kept in the page URL, which means anyone with the
+    link can see the data. Signing in to an account switches to the
+    account's id, which is held only in this session.
+    """
+    if "account_user_id" in st.session_state:
+        return st.session_state.account_user_id
+    user_id = st.query_params.get("uid")
+    if not user_id or not re.fullmatch(r"[0-9a-f]{32}", user_id):
+        user_id = uuid.uuid4().hex
+        st.query_params["uid"] = user_id
+    return user_id
+
+
+@st.cache_resource
+def get_journal_store():
+    return JournalStore(get_setting("JOURNAL_DB_PATH", "data/journal.db"))
+
+
+@st.cache_resource
+def get_user_store():
+    # Shared write-behind store; each session reads and writes only its user's keys
+    return UserStore(
+        SQLiteBackend(get_setting("USER_STORE_PATH", "data/user_state.db")),
+        flush_interval=float(get_setting("USER_STORE_FLUSH_SECONDS", 2.0)),
+    )
+
+
+@st.cache_resource
+def get_account_store():
+    return AccountStore(get_user_store())
+
+
+def switch_user(user_id):
+    """Use user_id (None for the link's id) from now on, dropping whatever the old user had loaded."""
+    for key in st.session_state.pop("loaded_user_keys", set()):
+        st.session_state.pop(key, None)
+    if user_id is None:
+        st.session_state.pop("account_user_id", None)
+        st.session_state.pop("account_name", None)
+    else:
+        st.session_state.account_user_id = user_id
+        # The link no longer identifies this user, so stop showing it
+        st.query_params.pop("uid", None)
+
+
+def account_form():
+    # Per-session limit on top of the per-name lockout in AccountStore
+    blocked_for = st.session_state.get("sign_in_blocked_until", 0) - time.monotonic()
+    with st.form("account_form", clear_on_submit=True):
+        name = st.text_input("Name")
+        passphrase = st.text_input("Passphrase", type="password")
+        col1, col2 = st.columns(2)
+        signing_in = col1.form_submit_button("Sign in")
+        registering = col2.form_submit_button("Create account")
+        if not (signing_in or registering):
+            return
+    if blocked_for > 0:
+        st.error(f"Too many attempts; try again in {blocked_for:.0f} s.")
+        return
+    try:
+        if signing_in:
+            user_id = get_account_store().sign_in(name, passphrase)
+        else:
+            user_id = get_account_store().register(name, passphrase)
+    except AccountError as e:
+        failures = st.session_state.get("sign_in_failures", 0) + 1
+        st.session_state.sign_in_failures = failures
+        if failures % 5 == 0:
+            st.session_state.sign_in_blocked_until = time.monotonic() + 30 * 2 ** (failures // 5 - 1)
+        st.error(str(e))
+        return
+    st.session_state.sign_in_failures = 0
+    switch_user(user_id)
+    st.session_state.account_name = name.strip()
+    st.rerun()
+
+
+def privacy_controls():
+    with st.expander("🔒 Private data"):
+        if "account_user_id" in st.session_state:
+            st.caption(f"Signed in as {st.session_state.get('account_name', 'you')}. "
+                       "Your data is tied to your account; sign in again in each new visit.")
+            if st.button("Sign out"):
+                switch_user(None)
+                st.rerun()
+            return
+        st.caption(
+            "Your journal, mood and sleep data are tied to this page's link: anyone with the link "
+            "can read them, and losing the link loses them. Sign in to an account to keep them private. "
+            "Data saved under the link stays with the link."
+        )
+        account_form()
+
+
+def load_user_state(key, default, load=lambda value: value):
+    """Return st.session_state[key], loading the user's saved copy the first time a page needs it.
+
+    default() builds the initial value when nothing has been saved yet.
+    """
+    if key not in st.session_state:
+        saved = get_user_store().get(get_user_id(), key)
+        st.session_state[key] = load(saved) if saved is not None else default()
+        st.session_state.setdefault("loaded_user_keys", set()).add(key)
+    return st.session_state[key]
+
+
+def save_user_state(key, dump=lambda value: value):
+    """Queue the session's current st.session_state[key] to be saved for this user."""
+    get_user_store().put(get_user_id(), key, dump(st.session_state[key]))
+
+
+def delete_user_state(key):
+    st.session_state.pop(key, None)
+    get_user_store().delete(get_user_id(), key)
+
+
+@st.cache_resource
+def get_response_cache():
+    # One bounded cache per process; entries are scoped per session by default
+    return ResponseCache(
+        max_entries=int(get_setting("RESPONSE_CACHE_SIZE", 256)),
+        ttl_seconds=int(get_setting("RESPONSE_CACHE_TTL", 3600)),
+        per_session=str(get_setting("RESPONSE_CACHE_PER_SESSION", "true")).lower() != "false",
+    )
+
+
+@st.cache_resource
+def get_transcription_cache():
+    # Keyed on the audio content, so repeated clips hit wherever they came from
+    return TranscriptionCache(
+        max_entries=int(get_setting("TRANSCRIPTION_CACHE_SIZE", 512)),
+        persist_dir=get_setting("TRANSCRIPTION_CACHE_DIR"),
+    )
+
+
+@st.cache_resource
+def get_image_cache():
+    return ImageCache(
+        get_setting("IMAGE_CACHE_DIR", "data/image_cache"),
+        max_bytes=int(get_setting("IMAGE_CACHE_MB", 64)) * 1024 * 1024,
+        max_dimension=int(get_setting("IMAGE_MAX_DIMENSION", 800)),
+    )
+
+
+@st.cache_resource
+def get_meme_prefetcher():
+    # Shared by every session, so the buffer and the pooled connection stay warm;
+    # images are cached while memes wait in the buffer
+    image_cache = get_image_cache()
+    return MemePrefetcher(
+        get_setting("MEME_API_URL", "https://meme-api.com/gimme"),
+        buffer_size=int(get_setting("MEME_BUFFER_SIZE", 5)),
+        prepare=lambda meme: image_cache.get(meme.image_url),
+    )
+
+
+@st.cache_resource
+def get_audio_library():
+    library = AudioLibrary(
+        str(Path(__file__).parent / "assets" / "audio"),
+        cache_dir=get_setting("AUDIO_CACHE_DIR", "data/audio_cache"),
+        bitrate=get_setting("AUDIO_STREAM_BITRATE", "64k"),
+    )
+    # Read every track once and start any low-bitrate transcodes up front
+    library.prepare_all()
+    return library
+
+
+@st.cache_resource
+def get_resource_registry():
+    return ResourceRegistry()
+
+
+@st.cache_resource
+def get_state_profiler():
+    # One per worker process, so its totals are this worker's session_state memory
+    return FootprintRegistry(sample_every=float(get_setting("STATE_PROFILE_SECONDS", 60)))
+
+
+def profile_session_state():
+    """Re-measure this session's session_state if its last sample is old enough."""
+    profiler = get_state_profiler()
+    session_id = get_session_id()
+    if profiler.due(session_id):
+        # Shared clients hang off the assistant; they belong to the worker, not the session
+        shared = {id(obj) for obj in get_resource_registry().objects()}
+        profiler.measure(session_id, st.session_state.to_dict(), exclude_ids=shared)
+
+
+def build_model():
+    """Create the model for MODEL_BACKEND behind the async client layer (timeouts, retries, limits)."""
+    backend = get_setting("MODEL_BACKEND", "gemini")
+    if backend == "fake":
+        # Offline model that streams a canned reply, for local runs without an API key
+        provider = ModelProvider(FakeStreamingModel(), name="fake")
+    elif backend == "clarifai":
+        pat = get_setting("PAT", PAT)
+        if not pat:
+            raise ValueError("Clarifai PAT is missing. Please configure it.")
+        provider = ClarifaiProvider(pat, USER_ID, APP_ID, MODEL_ID, MODEL_VERSION_ID)
+    elif backend == "http":
+        # Any endpoint speaking the StubModelServer protocol, e.g. `python model_client.py`
+        provider = HttpProvider(get_setting("MODEL_HTTP_URL", "http://127.0.0.1:8765"))
+    else:
+        api_key = get_setting("GOOGLE_AI_API_KEY")
+        if not api_key:
+            raise ValueError("Google AI API Key is missing. Please configure it.")
+
+        genai.configure(api_key=api_key)
+        provider = ModelProvider(genai.GenerativeModel(model_name='gemini-1.5-flash'))
+
+    client = AsyncModelClient(
+        provider,
+        timeout=float(get_setting("MODEL_TIMEOUT", 30)),
+        deadline=float(get_setting("MODEL_DEADLINE", 60)),
+        retries=int(get_setting("MODEL_RETRIES", 2)),
+        max_concurrency=int(get_setting("MODEL_MAX_CONCURRENCY", 8)),
+    )
+    return client.as_model()
+
+
+def build_speech_backend():
+    """Create the speech-recognition backend named by SPEECH_BACKEND (default: google)."""
+    name = get_setting("SPEECH_BACKEND", "google")
+    options = {}
+    if name == "vosk":
+        options["model_path"] = get_setting("VOSK_MODEL_PATH", "models/vosk")
+    elif name == "whisper":
+        options["model"] = get_setting("WHISPER_MODEL", "base")
+    return create_backend(name, **options)
+
+
+def speak_on_server():
+    """Whether replies play on the server's own audio device (TTS_OUTPUT=speaker) instead of in the browser.
+
+    gTTS can only render audio, so with it replies always play in the browser.
+    """
+    return (get_setting("TTS_OUTPUT", "browser") == "speaker"
+            and get_setting("TTS_ENGINE", "pyttsx3") != "gtts")
+
+
+def build_tts_pool():
+    """Create the TTS workers; each worker builds its own engine on its own thread."""
+    if get_setting("TTS_ENGINE", "pyttsx3") == "gtts":
+        factory, default_workers = GTTSSynthesizer, 2
+    else:
+        # pyttsx3 drives a single shared driver, so keep it on one thread
+        factory, default_workers = Pyttsx3Synthesizer, 1
+    return TTSWorkerPool(
+        factory,
+        workers=int(get_setting("TTS_WORKERS", default_workers)),
+        max_queue=int(get_setting("TTS_QUEUE_SIZE", 8)),
+    )
+
+
+@st.cache_resource
+def get_page_router():
+    # Built once per process; render times go to the profiler's "page:" series
+    return PageRouter(on_render=lambda name, seconds: default_profiler.observe_seconds(f"page:{name}", seconds))
+
+
+def register_pages(router):
+    # Re-registered every rerun so the router always calls this run's functions
+    router.register("Chatbot", lambda: get_assistant().run_voice_assistant())
+    router.register("Breathing Center", breathing_center_page)
+    router.register("Therapeutic Activities", therapeutic_activities_page)
+    router.register("Sleep Tracker", sleep_tracker_page)
+    router.register("Mood Tracker", mood_tracker_page)
+    router.register("Journal Center", journal_page)
+    router.register("BrainRot Memes", brainrot_corner_page)
+    router.register("Stress Buster", stress_burster)
+    router.register("Game Center", game_center_page)
+    if str(get_setting("SHOW_DIAGNOSTICS", "false")).lower() == "true":
+        router.register("Admin", admin_page)
+
+
+def get_assistant():
+    """Return this session's VoiceAssistant, creating it on the first rerun."""
+    if 'assistant' not in st.session_state:
+        st.session_state.assistant = VoiceAssistant()
+    return st.session_state.assistant
+
+
 # Constants for Clarifai API
 PAT = os.getenv('PAT')
 USER_ID = 'anthropic'
@@ -38,75 +364,199 @@ MODEL_VERSION_ID = '0b59b93d35864b9b88699a557629babf'
 
 class VoiceAssistant:
     def __init__(self):
-        # Configure Google Generative AI (Gemini)
+        # Heavy clients are shared by every session; only the recognizer, which
+        # keeps per-user calibration state, is created per session
         try:
-            api_key = os.getenv("GOOGLE_AI_API_KEY") or st.secrets.get("GOOGLE_AI_API_KEY")
-
-            if not api_key:
-                st.error("Google AI API Key is missing. Please configure it.")
-                st.stop()
-
-            genai.configure(api_key=api_key)
-
-            # Initialize speech recognition and TTS engine
-            self.model = genai.GenerativeModel(model_name='gemini-1.5-flash')
+            registry = get_resource_registry()
+            self.model = registry.get("model", build_model)
+            self.tts_pool = registry.get("tts_pool", build_tts_pool)
+            self.speech_backend = registry.get("speech_backend", build_speech_backend)
+            self.conversation = ConversationStore(
+                budget_tokens=int(get_setting("CONTEXT_BUDGET_TOKENS", 1200)),
+                keep_recent=int(get_setting("CONTEXT_KEEP_TURNS", 4)),
+            )
+            self.last_exchange = None
             self.recognizer = sr.Recognizer()
-            self.tts_engine = pyttsx3.init()
-            self.tts_engine.setProperty("rate", 150)  # Adjust speaking rate
-            self.tts_engine.setProperty("volume", 0.8)  # Set volume
+            registry.record_handle("assistant_handle")
 
         except Exception as e:
             st.error(f"Initialization Error: {e}")
             st.stop()
 
-    @st.cache_resource
-    def generate_response(_self, user_message):
+    def build_prompt(self, user_message):
+        # Create a prompt that limits the scope to self-help and personal questions
+        instructions = """Answer as a mental health therapist in English language only. Reply within 100 words. 
+            Answer only mental health related questions, if not reply 'I cannot answer that question'."""
+
+        # Keep the whole request under the context budget by summarizing older turns
+        self.conversation.compact(reserve_tokens=estimate_tokens(instructions + user_message))
+        history = self.conversation.render_context()
+        if history:
+            instructions = f"{instructions}\n{history}"
+        return f"""{instructions}
+            User message: {user_message}"""
+
+    def remember(self, user_message, reply):
+        self.conversation.add("user", user_message)
+        self.conversation.add("assistant", reply)
+
+    def generate_response(self, user_message):
         """Generate a response using Google Generative AI."""
         if not user_message:
             return "Sorry, I didn't hear anything."
 
-        try:
-            # Create a prompt that limits the scope to self-help and personal questions
-            prompt = f"""Answer as a mental health therapist in English language only. Reply within 100 words. 
-            Answer only mental health related questions, if not reply 'I cannot answer that question'.
-            User message: {user_message}"""
-        
-            response = _self.model.generate_content(prompt)
+        prompt = self.build_prompt(user_message)
+
+        @timed("call:model.generate")
+        def compute():
+            response = self.model.generate_content(prompt)
             return response.text.strip()  # Return the full response without character limit
+
+        try:
+            reply = get_response_cache().get_or_compute(prompt, compute, session_id=get_session_id())
+            self.remember(user_message, reply)
+            return reply
         except Exception as e:
             st.error(f"AI response generation error: {e}")
             return "Sorry, I encountered an error processing your request."
-        
-    def record_audio(self, duration=5):
-        """Record audio from the microphone and save as WAV file."""
+
+    def stream_response(self, user_message, placeholder, on_text=None):
+        """Render the reply into placeholder chunk by chunk and return the full text.
+
+        on_text, if given, is called with each new piece of the reply as it arrives.
+        """
+        on_text = on_text or (lambda text: None)
+        if not user_message:
+            reply = "Sorry, I didn't hear anything."
+            placeholder.markdown(f"Assistant: {reply}")
+            on_text(reply)
+            return reply
+
+        cache = get_response_cache()
+        session_id = get_session_id()
+        prompt = self.build_prompt(user_message)
+        cached = cache.get(prompt, session_id)
+        if cached is not None:
+            placeholder.markdown(f"Assistant: {cached}")
+            on_text(cached)
+            self.remember(user_message, cached)
+            return cached
+
+        stats = StreamStats()
+        reply = ""
         try:
-            st.info(f"Recording for {duration} seconds...")
-            recording = sd.rec(int(duration * 16000), samplerate=16000, channels=1, dtype='float32')
-            sd.wait()  # Wait until recording is finished
-
-            # Save recording as WAV file
-            wav_filename = "recorded_audio.wav"
-            with wave.open(wav_filename, 'wb') as wf:
-                wf.setnchannels(1)
-                wf.setsampwidth(2)  # 2 bytes per sample for 16-bit audio
-                wf.setframerate(16000)
-                wf.writeframes((recording * 32767).astype(np.int16).tobytes())
-
-            return wav_filename
+            with timed("call:model.stream"):
+                for text in iter_text_chunks(self.model, prompt, stats):
+                    reply += text
+                    placeholder.markdown(f"Assistant: {reply}▌")
+                    on_text(text)
+            reply = reply.strip()
+            cache.put(prompt, reply, session_id)
+            self.remember(user_message, reply)
+        except Exception as e:
+            st.error(f"AI response generation error: {e}")
+            reply = reply.strip() or "Sorry, I encountered an error processing your request."
+        finally:
+            if stats.time_to_first_token is not None:
+                default_profiler.observe_seconds("latency:first_token", stats.time_to_first_token)
+            if stats.total_time is not None:
+                default_profiler.observe_seconds("latency:stream_total", stats.total_time)
+
+        placeholder.markdown(f"Assistant: {reply}")
+        if stats.time_to_first_token is not None:
+            st.caption(f"First token after {stats.time_to_first_token * 1000:.0f} ms")
+        return reply
+
+    def respond(self, user_message):
+        """Show the assistant's reply, streaming it when enabled."""
+        if str(get_setting("STREAM_RESPONSES", "true")).lower() == "true":
+            return self.stream_response(user_message, st.empty())
+        response = self.generate_response(user_message)
+        st.markdown(f"Assistant: {response}")
+        return response
+
+    def respond_and_speak(self, user_message):
+        """Show the reply and read it aloud, synthesizing each sentence while the rest streams in."""
+        streaming = str(get_setting("STREAM_RESPONSES", "true")).lower() == "true"
+        if not streaming or speak_on_server():
+            response = self.respond(user_message)
+            self.text_to_speech(response)
+            return response
+
+        pipeline = SpeechPipeline(self.tts_pool, get_session_id())
+        response = self.stream_response(user_message, st.empty(), on_text=pipeline.feed)
+        pipeline.finish()
+
+        try:
+            clip = pipeline.joined_audio(timeout=float(get_setting("TTS_TIMEOUT", 30)))
+            if clip:
+                st.audio(clip[0], format=clip[1])
+            if pipeline.time_to_first_segment is not None:
+                default_profiler.observe_seconds("latency:first_sentence_audio", pipeline.time_to_first_segment)
+                # Playback starts once the whole reply is joined, so report both
+                st.caption(f"First sentence synthesized after {pipeline.time_to_first_segment * 1000:.0f} ms; "
+                           f"audio ready after {pipeline.time_to_audio_ready * 1000:.0f} ms")
+        except Exception as e:
+            st.error(f"Speech synthesis error: {e}")
+        if pipeline.dropped:
+            st.warning("Speech is busy right now, so only the start of this reply will be read aloud.")
+        return response
+
+    def start_recording(self, max_seconds=10):
+        """Start capturing microphone audio in the background for this session."""
+        try:
+            if get_setting("AUDIO_SOURCE", "microphone") == "synthetic":
+                # Headless input for environments without a microphone
+                sample_file = get_setting("AUDIO_SOURCE_FILE")
+                source = SyntheticSource.from_wav(sample_file) if sample_file else SyntheticSource()
+            else:
+                source = MicrophoneSource()
+            capture = AudioCapture(source, max_seconds=max_seconds)
+            if str(get_setting("VAD_AUTO_STOP", "true")).lower() == "true":
+                # End the recording once the speaker has gone quiet
+                capture.listeners.append(EndpointDetector(capture.sample_rate))
+            self.capture = capture.start()
+        except Exception as e:
+            self.capture = None
+            st.error(f"Audio recording error: {e}")
+
+    def has_recording(self):
+        """True while a capture is running or waiting to be collected."""
+        return getattr(self, "capture", None) is not None
+
+    def stop_recording(self):
+        """Stop the capture and return the speech, trimmed of silence, as an in-memory WAV buffer."""
+        capture = getattr(self, "capture", None)
+        if capture is None:
+            return None
+        self.capture = None
+        try:
+            capture.stop()
+            speech = trim_silence(capture.samples(), capture.sample_rate)
+            if not len(speech):
+                return None
+            return pcm16_wav_buffer(speech, capture.sample_rate)
         except Exception as e:
             st.error(f"Audio recording error: {e}")
             return None
 
-    @st.cache_data
-    def transcribe_audio(_self, wav_filename):
-        """Transcribe recorded audio file to text using Google Speech Recognition."""
-        if not wav_filename:
+    def transcribe_audio(self, audio_source):
+        """Transcribe a WAV file or in-memory WAV buffer to text with the configured speech backend."""
+        if not audio_source:
             return ""
 
         try:
-            with sr.AudioFile(wav_filename) as source:
-                audio = _self.recognizer.record(source)
-                return _self.recognizer.recognize_google(audio)
+            cache = get_transcription_cache()
+            key = f"{self.speech_backend.name}:{audio_fingerprint(audio_source)}"
+            text = cache.get(key)
+            if text is not None:
+                return text
+
+            with timed(f"call:transcribe.{self.speech_backend.name}"), sr.AudioFile(audio_source) as source:
+                audio = self.recognizer.record(source)
+                text = self.speech_backend.transcribe(audio)
+            cache.put(key, text)
+            return text
         except sr.UnknownValueError:
             st.warning("Could not understand audio")
             return ""
@@ -118,15 +568,17 @@ class VoiceAssistant:
             return ""
 
     def text_to_speech(self, text):
-        """Convert text to speech using pyttsx3 in a separate thread."""
+        """Speak text through the shared TTS workers, in the browser by default."""
         try:
-            def speak():
-                self.tts_engine.say(text)
-                self.tts_engine.runAndWait()
-
-            # Run the TTS engine in a separate thread to avoid UI blocking
-            tts_thread = Thread(target=speak, daemon=True)
-            tts_thread.start()
+            render = not speak_on_server()
+            future = self.tts_pool.submit(text, session_id=get_session_id(), render=render)
+            if future is None:
+                st.warning("Speech is busy right now, so this reply won't be read aloud.")
+                return
+
+            if render:
+                audio_bytes, mime = future.result(timeout=float(get_setting("TTS_TIMEOUT", 30)))
+                st.audio(audio_bytes, format=mime)
         except Exception as e:
             st.error(f"Speech synthesis error: {e}")
             
@@ -138,32 +590,44 @@ class VoiceAssistant:
         # Text input fallback
         user_message = st.text_input("Or type your message:")
 
-        if st.button("Talk Tuah Therapist") or user_message:
-            if user_message:
-                # Use text input if provided
-                st.markdown(f"You: {user_message}")
-                response = self.generate_response(user_message)
-                st.markdown(f"Assistant: {response}")
-                self.text_to_speech(response)
+        # Recording runs in the background; the script only starts and stops it
+        if self.has_recording():
+            if self.capture.is_active:
+                st.info("Recording... it stops when you pause, or press Stop (up to 10 seconds).")
             else:
-                # Record audio
-                audio_file = self.record_audio(duration=10)
+                st.info("Recording finished. Press Stop to send it.")
+            if st.button("Stop Recording"):
+                audio_buffer = self.stop_recording()
 
-                if audio_file:
-                    # Transcribe the recorded audio
-                    user_message = self.transcribe_audio(audio_file)
+                # Transcribe the recorded audio
+                user_message = self.transcribe_audio(audio_buffer)
 
-                    if user_message:
-                        st.markdown(f"You: {user_message}")
+                if user_message:
+                    st.markdown(f"You: {user_message}")
 
-                        # Generate and play response
-                        response = self.generate_response(user_message)
-                        st.markdown(f"Assistant: {response}")
+                    # Generate and play response
+                    self.respond_and_speak(user_message)
+                else:
+                    st.warning("No speech detected. Please try again.")
 
-                        # Attempt text-to-speech
-                        self.text_to_speech(response)
-                    else:
-                        st.warning("No speech detected. Please try again.")
+        elif st.button("Talk Tuah Therapist") or user_message:
+            if user_message:
+                # Use text input if provided
+                st.markdown(f"You: {user_message}")
+                if self.last_exchange and self.last_exchange[0] == user_message:
+                    # The text box keeps its value across reruns; don't answer (or remember) it twice
+                    st.markdown(f"Assistant: {self.last_exchange[1]}")
+                else:
+                    self.last_exchange = (user_message, self.respond_and_speak(user_message))
+            else:
+                self.start_recording(max_seconds=10)
+                if self.has_recording():
+                    st.rerun()
+
+        if (self.conversation.turns or self.conversation.summary) and st.button("Start a New Conversation"):
+            self.conversation.clear()
+            self.last_exchange = None
+            st.success("Conversation cleared.")
 
 
 def init_styles():
@@ -185,31 +649,15 @@ def main():
     with col2:
         st.title("Talk Tuah Therapist")
         st.markdown("Your Safe Space for Healing: Chat, Journal, Grow.")
-    tab1, tab2, tab3, tab4, tab5, tab6, tab7, tab8, tab9 = st.tabs([
-        "Chatbot", "Breathing Center", "Therapeutic Activities",
-        "Sleep Tracker", "Mood Tracker", "Journal Center", 
-        "BrainRot Memes", "Stress Buster", "Game Center"
-    ])
-
-    with tab1:
-        assistant = VoiceAssistant()
-        assistant.run_voice_assistant()
-    with tab2:
-        breathing_center_page()
-    with tab3:
-        therapeutic_activities_page()
-    with tab4:
-        sleep_tracker_page()
-    with tab5:  
-        mood_tracker_page()
-    with tab6:
-        journal_page()
-    with tab7:
-        brainrot_corner_page()
-    with tab8:
-        stress_burster()
-    with tab9:
-        game_center_page()
+    # Only the selected page runs on a rerun; the others keep their session data
+    router = get_page_router()
+    register_pages(router)
+    active_page = st.radio(
+        "Navigate", router.names(), horizontal=True,
+        key="active_page", label_visibility="collapsed"
+    )
+    router.render(active_page)
+    profile_session_state()
 
 
     # Add Resources section in sidebar
@@ -218,6 +666,11 @@ def main():
         if st.button("View Mental Health Resources"):
             resources_page()
 
+        privacy_controls()
+
+        if str(get_setting("SHOW_DIAGNOSTICS", "false")).lower() == "true":
+            diagnostics_panel()
+
     st.markdown("""
 Created with ❤ for mental health awareness
 By:Akriti Kh,Bhoomika K S,Chidananda S,Rohith BN
@@ -233,19 +686,110 @@ For Queries, dm on <a href="https://www.instagram.com/talktuahtherapist">TalkTua
 
 
 
-def process_message(message_text):
-    response = generate_response(message_text)
-    
-    if response:
-        st.session_state.messages.append({"role": "user", "content": message_text})
-        st.session_state.messages.append({"role": "assistant", "content": response})
-        
-        audio_file = speak(response)
-        if audio_file:
-            st.audio(audio_file)
+def timing_table(summaries):
+    if not summaries:
+        st.caption("No samples yet.")
+        return
+    st.table([
+        {
+            "name": name.split(":", 1)[-1],
+            "calls": summary["calls"],
+            "errors": summary["errors"],
+            "p50 ms": round(summary["p50_ms"], 2),
+            "p95 ms": round(summary["p95_ms"], 2),
+            "p99 ms": round(summary["p99_ms"], 2),
+            "max ms": round(summary["max_ms"], 2),
+        }
+        for name, summary in summaries.items()
+    ])
 
 
+def admin_page():
+    """Timing dashboard: where reruns spend their time, per page and per external call."""
+    st.title("🛠️ Admin")
+    profiler = default_profiler
+
+    st.subheader("Reruns")
+    timing_table(profiler.stats("rerun"))
+    st.subheader("Pages")
+    timing_table(profiler.stats("page:"))
+    st.subheader("External calls")
+    timing_table(profiler.stats("call:"))
+    st.subheader("Figure builds")
+    timing_table(profiler.stats("build:"))
+    st.subheader("User-facing latency")
+    timing_table(profiler.stats("latency:"))
+
+    st.subheader("Sampled cProfile")
+    profiler.sample_every = st.number_input(
+        "Profile one rerun in every (0 = off):", min_value=0, value=profiler.sample_every, step=10
+    )
+    top = profiler.top_functions()
+    if top:
+        st.table([{**row, "own_ms": round(row["own_ms"], 2), "cumulative_ms": round(row["cumulative_ms"], 2)}
+                  for row in top])
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.download_button("Export timings (JSON)", profiler.export_json(),
+                           file_name="timings.json", mime="application/json")
+    with col2:
+        pstats_data = profiler.export_pstats()
+        if pstats_data is not None:
+            st.download_button("Export profile (pstats)", pstats_data,
+                               file_name="reruns.prof", mime="application/octet-stream")
+    with col3:
+        if st.button("Reset"):
+            profiler.reset()
+            st.rerun()
+
+
+def diagnostics_panel():
+    """Sidebar view of process-wide cache and resource counters."""
+    with st.expander("Diagnostics"):
+        st.write("Response cache")
+        st.json(get_response_cache().stats())
+        st.write("Latency (first token, full stream, first sentence audio)")
+        st.json(default_profiler.stats("latency:"))
+        st.write("Shared resources")
+        st.json(get_resource_registry().stats())
+        st.write("Accounts")
+        st.json(get_account_store().stats())
+        st.write("Transcription cache")
+        st.json(get_transcription_cache().stats())
+        st.write("Text-to-speech workers")
+        st.json(get_resource_registry().get("tts_pool", build_tts_pool).stats())
+        if 'assistant' in st.session_state:
+            st.write("Conversation memory")
+            st.json(st.session_state.assistant.conversation.stats())
+            st.write("Model client")
+            st.json(st.session_state.assistant.model.client.stats())
+            st.write("Speech recognition")
+            st.json(st.session_state.assistant.speech_backend.stats())
+        st.write("Page render times")
+        st.json(default_profiler.stats("page:"))
+        st.write("Saved user data")
+        st.json(get_user_store().stats())
+        st.write("Meme prefetching")
+        st.json(get_meme_prefetcher().stats())
+        st.write("Image cache")
+        st.json(get_image_cache().stats())
+        st.write("Audio assets")
+        st.json(get_audio_library().stats())
+        st.write("Session state, this session (bytes)")
+        sizes = get_state_profiler().session(get_session_id())
+        st.json(dict(sorted(sizes.items(), key=lambda item: item[1], reverse=True)))
+        st.write("Session state, this worker")
+        st.json(get_state_profiler().stats())
+        suggestions = [s for s in (suggest_compaction(key, value) for key, value in st.session_state.to_dict().items()) if s]
+        if suggestions:
+            st.write("Compaction suggestions")
+            st.json(suggestions)
+
 
+def process_message(message_text):
+    """Answer a message through this session's assistant, which keeps the conversation history."""
+    return get_assistant().respond_and_speak(message_text)
 
 
 def game_center_page():
@@ -255,14 +799,14 @@ def game_center_page():
         st.title("🧠 Memory Matcher")
         
         # Game setup
-        if 'game_state' not in st.session_state:
+        def new_game():
             # Generate 12 unique emoji pairs
             emojis = ['🍎', '🍌', '🍇', '🍊', '🍉', '🍓', 
                       '🚗', '🚀', '🎈', '🏀', '🐶', '🐱']
             board = emojis * 2  # Create pairs
             random.shuffle(board)  # Shuffle the board
             
-            st.session_state.game_state = {
+            return {
                 'board': board,
                 'flipped': [],
                 'matched': [],
@@ -270,7 +814,7 @@ def game_center_page():
                 'game_over': False
             }
         
-        game = st.session_state.game_state
+        game = load_user_state('game_state', new_game)
         
         # Game grid with 12 buttons
         cols = st.columns(4)  # Create 4 columns for layout
@@ -297,6 +841,7 @@ def game_center_page():
                                 
                                 # Clear flipped cards after processing
                                 game['flipped'] = []
+                            save_user_state('game_state')
                 else:
                     # Show the matched emoji
                     st.button(game['board'][i], disabled=True, key=f"matched_{i}")
@@ -308,12 +853,14 @@ def game_center_page():
         if len(game['matched']) == 12:  # All pairs found (12 emojis)
             st.balloons()
             st.success("Congratulations! You found all pairs! 🎉")
-            game['game_over'] = True
+            if not game['game_over']:
+                game['game_over'] = True
+                save_user_state('game_state')
         
         # Reset game button (only visible if the game is over)
         if game.get('game_over'):
             if st.button("New Game", key="new_game"):
-                del st.session_state.game_state
+                delete_user_state('game_state')
 
     with tab2:
         st.title("✊ Rock Paper Scissors Showdown!")
@@ -443,7 +990,7 @@ def breathing_center_page():
         with col2:
             breathing_exercise = st.selectbox(
                 "Select a breathing exercise:",
-                ["Box Breathing", "4-7-8 Breathing", "Deep Breathing"],
+                list(BREATHING_EXERCISES),
                 key="breathing_select"
             )
             
@@ -470,54 +1017,48 @@ def breathing_center_page():
                 play_music = st.checkbox("🎵 Play Meditation Music", key="play_music")
                 
             if play_music:
-                audio_file = open('assets/audio/meditation.mp3', 'rb')
-                audio_bytes = audio_file.read()
-                st.audio(audio_bytes, format='audio/mp3')
+                # Cached once per process; the browser streams it from the media endpoint
+                music = get_audio_library().get("meditation.mp3")
+                if music is None:
+                    st.info("Meditation music isn't available right now.")
+                else:
+                    st.audio(music.data, format=music.mime)
             
             if start_button:
-                progress_bar = st.progress(0)
-                status_text = st.empty()
-                
-                if breathing_exercise == "Box Breathing":
-                    for cycle in range(4):
-                        for phase, duration in [("Inhale", 4), ("Hold", 4), ("Exhale", 4), ("Hold", 4)]:
-                            status_text.markdown(
-                                f'<p class="timer-text">{phase}</p>', unsafe_allow_html=True)
-                            for i in range(duration):
-                                progress_bar.progress((i + 1) / duration)
-                                time.sleep(1)
-                            progress_bar.progress(0)
-                            
-                elif breathing_exercise == "4-7-8 Breathing":
-                    for cycle in range(4):
-                        for phase, duration in [("Inhale", 4), ("Hold", 7), ("Exhale", 8)]:
-                            status_text.markdown(
-                                f'<p class="timer-text">{phase}</p>', unsafe_allow_html=True)
-                            for i in range(duration):
-                                progress_bar.progress((i + 1) / duration)
-                                time.sleep(1)
-                            progress_bar.progress(0)
-                            
-                elif breathing_exercise == "Deep Breathing":
-                    for cycle in range(4):
-                        for phase, duration in [("Inhale Deeply", 4), ("Hold", 2), ("Exhale Slowly", 4), ("Rest", 2)]:
-                            status_text.markdown(
-                                f'<p class="timer-text">{phase}</p>', unsafe_allow_html=True)
-                            for i in range(duration):
-                                progress_bar.progress((i + 1) / duration)
-                                time.sleep(1)
-                            progress_bar.progress(0)
-                            
-                st.success("✨ Exercise completed! Take a moment to notice how you feel.")
+                st.session_state.breathing_session = {
+                    'exercise': breathing_exercise,
+                    'started_at': time.time()
+                }
+
+            # Progress comes from elapsed wall-clock time; the browser animates
+            # it between reruns so no script thread sleeps through the session
+            session = st.session_state.get('breathing_session')
+            if session:
+                exercise = BREATHING_EXERCISES[session['exercise']]
+                elapsed = time.time() - session['started_at']
+                state = exercise.state_at(elapsed)
+
+                if state.done:
+                    del st.session_state.breathing_session
+                    st.success("✨ Exercise completed! Take a moment to notice how you feel.")
+                else:
+                    components.html(exercise.timer_html(elapsed), height=200)
+                    if st.button("Stop Exercise ⏹️", key="stop_breathing", use_container_width=True):
+                        del st.session_state.breathing_session
+                        st.rerun()
 
 
 
 def journal_page():
     st.title("📝 Personal Journal")
+    if "account_user_id" not in st.session_state:
+        st.caption("🔗 Entries are tied to this page's link, so anyone with it can read them. "
+                   "Sign in under 🔒 Private data in the sidebar to keep them private.")
     
-    # Initialize the journal entries list in session state if not already done
-    if 'journal_entries' not in st.session_state:
-        st.session_state.journal_entries = []
+    # Entries live in a durable store, indexed for search
+    store = get_journal_store()
+    user_id = get_user_id()
+    page_size = 10
     
     # Create a main container for better layout
     with st.container():
@@ -546,21 +1087,16 @@ def journal_page():
             # Submit entry button
             if st.button("💾 Save Entry", use_container_width=True):
                 if journal_entry.strip():
-                    # Get the current time and format it
-                    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    # Append the entry and timestamp to the session state
-                    st.session_state.journal_entries.append((current_time, journal_entry))
+                    store.add(user_id, journal_entry)
                     st.success("Entry saved successfully!")
-                     # Use st.rerun() instead of st.experimental_rerun()
                 else:
                     st.error("Please write something before submitting!")
             
             # Clear entries with enhanced confirmation
             if st.button("🗑️ Clear All Entries", use_container_width=True):
-                 if st.session_state.journal_entries:
+                 if store.count(user_id):
                      if st.checkbox("Are you sure you want to clear all entries?"):
-            # Directly clear the list of journal entries
-                            st.session_state.journal_entries = []
+                            store.clear(user_id)
                             st.success("All entries have been cleared!")
                             st.rerun()
                  else:
@@ -573,19 +1109,22 @@ def journal_page():
         st.write("### Search Entries")
         search_term = st.text_input("Search your journal entries:")
         
-        # Display journal entries with search filtering
-        if st.session_state.journal_entries:
-            filtered_entries = [
-                entry for entry in st.session_state.journal_entries 
-                if search_term.lower() in entry[1].lower()
-            ]
-            
-            if filtered_entries:
-                st.write("### Your Journal Entries")
-                for time_sent, message in reversed(filtered_entries):
-                    with st.expander(f"Entry from {time_sent}"):
-                        st.write(message)
-            else:
+        # Display journal entries a page at a time, best matches first when searching
+        if store.count(user_id):
+            def render_entry(entry):
+                entry_id, time_sent, message = entry
+                with st.expander(f"Entry from {time_sent}"):
+                    st.write(message)
+
+            st.write("### Your Journal Entries")
+            shown = paginated_list(
+                "journal_results",
+                lambda cursor, limit: store.page(user_id, search_term, cursor, limit),
+                render_entry,
+                page_size=page_size,
+                reset_on=search_term,
+            )
+            if not shown:
                 st.info("No entries match your search term.")
         else:
             st.info("No journal entries yet. Start writing your first entry!")
@@ -638,12 +1177,39 @@ def stress_burster():
 
 
 
+@timed("build:mood_figure")
+def build_mood_figure(store):
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=store.timestamps,
+        y=store.scores,
+        mode='lines+markers',
+        name='Mood',
+        line=dict(color='#236860'),
+        marker=dict(size=8)
+    ))
+    fig.add_trace(go.Scatter(
+        x=store.timestamps,
+        y=store.rolling_mean(7),
+        mode='lines',
+        name='7-entry average',
+        line=dict(color='#9bc1bc', dash='dot')
+    ))
+
+    fig.update_layout(
+        title='Mood Over Time',
+        xaxis_title='Date',
+        yaxis_title='Mood Level',
+        yaxis_range=[0, 11],
+        height=400
+    )
+    return fig
+
 def mood_tracker_page():
     st.title("📊 Mood Tracker")
     
-    # Initialize mood history in session state
-    if 'mood_history' not in st.session_state:
-        st.session_state.mood_history = []
+    # Load the saved mood history the first time this session opens the page
+    store = load_user_state('mood_history', MoodStore, MoodStore.from_records)
     
     # Mood input section
     st.subheader("How are you feeling today?")
@@ -663,55 +1229,43 @@ def mood_tracker_page():
         }
         st.markdown(f"### {mood_emojis[mood_scale]}")
         if st.button("Save Mood"):
-            current_time = datetime.now()
-            st.session_state.mood_history.append({
-                'date': current_time,
-                'mood': mood_scale,
-                'notes': mood_notes
-            })
+            store.append(datetime.now(), mood_scale, mood_notes)
+            save_user_state('mood_history', MoodStore.to_records)
             st.success("Mood recorded!")
     
     # Display mood history graph
-    if st.session_state.mood_history:
+    if len(store):
         st.subheader("Your Mood History")
-        
-        # Convert mood history to DataFrame
-        df = pd.DataFrame(st.session_state.mood_history)
-        
-        # Create line chart using plotly
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(
-            x=df['date'],
-            y=df['mood'],
-            mode='lines+markers',
-            name='Mood',
-            line=dict(color='#236860'),
-            marker=dict(size=8)
-        ))
-        
-        fig.update_layout(
-            title='Mood Over Time',
-            xaxis_title='Date',
-            yaxis_title='Mood Level',
-            yaxis_range=[0, 11],
-            height=400
-        )
-        
-        st.plotly_chart(fig, use_container_width=True)
+
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Average mood", f"{store.mean():.1f}")
+        col2.metric("Last 7 entries", f"{store.mean(last=7):.1f}")
+        col3.metric("Day streak", store.current_streak())
+
+        # The figure is rebuilt only when a new entry has been saved
+        st.plotly_chart(store.figure(build_mood_figure), use_container_width=True)
         
         # Display mood entries
         st.subheader("Recent Entries")
-        for entry in reversed(st.session_state.mood_history[-5:]):
+
+        def render_mood_entry(entry):
             with st.expander(f"Entry from {entry['date'].strftime('%Y-%m-%d %H:%M')}"):
                 st.write(f"Mood: {entry['mood']}/10 {mood_emojis[entry['mood']]}")
                 st.write(f"Notes: {entry['notes']}")
 
+        paginated_list("mood_entries", store.page, render_mood_entry, page_size=5)
+
+def gratitude_from_records(records):
+    return [{'date': datetime.fromisoformat(record['date']), 'entry': record['entry']} for record in records]
+
+def gratitude_to_records(entries):
+    return [{'date': entry['date'].isoformat(), 'entry': entry['entry']} for entry in entries]
+
 def gratitude_journal_page():
     st.title("🙏 Gratitude Journal")
     
-    # Initialize gratitude entries in session state
-    if 'gratitude_entries' not in st.session_state:
-        st.session_state.gratitude_entries = []
+    # Load the saved gratitude entries the first time this session opens the page
+    load_user_state('gratitude_entries', list, gratitude_from_records)
     
     st.markdown("""
     ### Daily Gratitude Practice
@@ -731,21 +1285,45 @@ def gratitude_journal_page():
                 'date': current_time,
                 'entry': gratitude_text
             })
+            save_user_state('gratitude_entries', gratitude_to_records)
             st.success("Gratitude entry saved! 🌟")
     
     # Display gratitude history
     if st.session_state.gratitude_entries:
         st.subheader("Your Gratitude Journey")
-        for entry in reversed(st.session_state.gratitude_entries):
+
+        def render_gratitude_entry(entry):
             with st.expander(f"Entry from {entry['date'].strftime('%Y-%m-%d %H:%M')}"):
                 st.write(entry['entry'])
 
+        paginated_list("gratitude_entries", list_page_fetcher(st.session_state.gratitude_entries),
+                       render_gratitude_entry)
+
+@timed("build:sleep_figure")
+def build_sleep_figure(stats):
+    dates, durations, nights_per_bar = stats.chart_series(max_points=400)
+
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=dates,
+        y=durations,
+        name='Sleep Duration' if nights_per_bar == 1 else f'Average of ~{nights_per_bar} nights',
+        marker_color='#236860'
+    ))
+    
+    fig.update_layout(
+        title='Sleep Duration Over Time',
+        xaxis_title='Date',
+        yaxis_title='Hours of Sleep',
+        height=400
+    )
+    return fig
+
 def sleep_tracker_page():
     st.title("😴 Sleep Tracker")
     
-    # Initialize sleep data in session state
-    if 'sleep_data' not in st.session_state:
-        st.session_state.sleep_data = []
+    # Load the saved sleep logs the first time this session opens the page
+    stats = load_user_state('sleep_data', SleepStats, SleepStats.from_records)
     
     # Sleep entry form
     st.subheader("Log Your Sleep")
@@ -759,7 +1337,7 @@ def sleep_tracker_page():
     with col2:
         sleep_quality = st.select_slider(
             "Sleep quality:",
-            options=["Poor", "Fair", "Good", "Very Good", "Excellent"],
+            options=QUALITY_LEVELS,
             value="Good"
         )
         
@@ -769,45 +1347,39 @@ def sleep_tracker_page():
         )
     
     if st.button("Save Sleep Log"):
-        st.session_state.sleep_data.append({
-            'date': sleep_date,
-            'duration': sleep_duration,
-            'quality': sleep_quality,
-            'factors': factors
-        })
+        stats.add(sleep_date, sleep_duration, sleep_quality, factors)
+        save_user_state('sleep_data', SleepStats.to_records)
         st.success("Sleep log saved!")
     
     # Display sleep statistics and graphs
-    if st.session_state.sleep_data:
+    if len(stats):
         st.subheader("Sleep Statistics")
         
-        # Convert to DataFrame
-        df = pd.DataFrame(st.session_state.sleep_data)
-        
-        # Create sleep duration chart
-        fig = go.Figure()
-        fig.add_trace(go.Bar(
-            x=df['date'],
-            y=df['duration'],
-            name='Sleep Duration',
-            marker_color='#236860'
-        ))
-        
-        fig.update_layout(
-            title='Sleep Duration Over Time',
-            xaxis_title='Date',
-            yaxis_title='Hours of Sleep',
-            height=400
-        )
-        
-        st.plotly_chart(fig, use_container_width=True)
+        # Long histories are averaged down to a fixed number of bars, and the
+        # figure is only rebuilt after a new log
+        st.plotly_chart(stats.figure(build_sleep_figure), use_container_width=True)
         
         # Display average sleep statistics
         col1, col2 = st.columns(2)
         with col1:
-            st.metric("Average Sleep Duration", f"{df['duration'].mean():.1f} hours")
+            st.metric("Average Sleep Duration", f"{stats.mean_duration:.1f} hours")
         with col2:
-            st.metric("Most Common Quality", df['quality'].mode()[0])
+            st.metric("Most Common Quality", stats.mode_quality)
+
+        # The calendar week, not the latest week that happens to have logs
+        today = datetime.now().date()
+        this_week = stats.week_mean_duration(today)
+        last_week = stats.week_mean_duration(today - timedelta(days=7))
+        if this_week is not None:
+            delta = None if last_week is None else f"{this_week - last_week:+.1f} vs previous week"
+            st.metric("This Week's Average", f"{this_week:.1f} hours", delta)
+
+        correlations = stats.factor_correlations("quality")
+        if correlations:
+            with st.expander("How factors relate to your sleep quality"):
+                for factor, r in sorted(correlations.items(), key=lambda item: item[1]):
+                    direction = "better" if r > 0 else "worse"
+                    st.write(f"{factor}: {direction} sleep (correlation {r:+.2f})")
 
 def resources_page():
     st.title("🆘 Mental Health Resources")
@@ -869,36 +1441,49 @@ def resources_page():
 def brainrot_corner_page():
     st.header("🎮 Brainrot Corner")
 
-    if 'meme_counter' not in st.session_state:
-        st.session_state.meme_counter = 0
+    load_user_state('meme_counter', int)
+
+    # Start filling the meme buffer as soon as the page is opened
+    prefetcher = get_meme_prefetcher()
+    prefetcher.warm()
 
     def fetch_random_meme():
         try:
-            # Fetch meme from a working API
-            response = requests.get("https://meme-api.com/gimme", timeout=10)  # Use a valid API
-            response.raise_for_status()
-            meme_data = response.json()
-            # Check the API response structure
-            image_url = meme_data.get('url', "https://via.placeholder.com/800x600")
-            meme_text = meme_data.get('title', "No caption available.")
-            return image_url, meme_text
-        except requests.exceptions.RequestException as e:
+            # Served from the prefetched buffer; only waits if it has run dry
+            with timed("call:meme"):
+                meme = prefetcher.get(timeout=10)
+            return meme.image_url, meme.title
+        except MemeUnavailable as e:
             # Handle API errors gracefully
             st.error(f"Error fetching meme: {e}")
             return "https://via.placeholder.com/800x600", "Error fetching meme! Try again."
 
     if st.button("Generate New Meme"):
         st.session_state.meme_counter += 1
+        save_user_state('meme_counter')
         image_url, meme_text = fetch_random_meme()
 
-        # Display the fetched meme
-        st.markdown(f"""
-            <div style="text-align: center; background-color: #1a1a1a; padding: 20px; border-radius: 10px; margin: 10px 0;">
-                <h2 style="color: white; font-size: 24px; margin-bottom: 20px;">{meme_text}</h2>
-                <img src="{image_url}" style="max-width: 100%; border-radius: 8px;" alt="Random Meme">
-                <p style="color: #888; margin-top: 15px;">Meme #{st.session_state.meme_counter}</p>
-            </div>
-        """, unsafe_allow_html=True)
+        # Display the fetched meme, served by the app from the local image cache
+        with timed("call:meme_image"):
+            cached = get_image_cache().get(image_url)
+        if cached is not None:
+            st.markdown(f"""
+                <div style="text-align: center; background-color: #1a1a1a; padding: 20px; border-radius: 10px 10px 0 0; margin-top: 10px;">
+                    <h2 style="color: white; font-size: 24px; margin: 0;">{meme_text}</h2>
+                </div>
+            """, unsafe_allow_html=True)
+            st.image(cached[0], use_column_width=True)
+            st.markdown(f"""
+                <p style="text-align: center; color: #888;">Meme #{st.session_state.meme_counter}</p>
+            """, unsafe_allow_html=True)
+        else:
+            st.markdown(f"""
+                <div style="text-align: center; background-color: #1a1a1a; padding: 20px; border-radius: 10px; margin: 10px 0;">
+                    <h2 style="color: white; font-size: 24px; margin-bottom: 20px;">{meme_text}</h2>
+                    <img src="{image_url}" style="max-width: 100%; border-radius: 8px;" alt="Random Meme">
+                    <p style="color: #888; margin-top: 15px;">Meme #{st.session_state.meme_counter}</p>
+                </div>
+            """, unsafe_allow_html=True)
 
         if st.session_state.meme_counter % 5 == 0:
             st.balloons()
@@ -917,12 +1502,12 @@ def brainrot_corner_page():
     """, unsafe_allow_html=True)
 
 
-def therapeutic_activities_page():
-
+@st.cache_data(max_entries=128)
+def drawing_png(drawing, max_size=None):
+    # Pixels are only produced here, once per saved drawing and size
+    return StrokeLog.from_records(drawing).png(max_size)
 
-    # Get the absolute path to the assets directory
-    assets_dir = Path(__file__).parent / "assets"
-    audio_dir = assets_dir / "audio"
+def therapeutic_activities_page():
 
     st.title("🎨 Therapeutic Activities")
     
@@ -986,45 +1571,107 @@ def therapeutic_activities_page():
         with col3:
             st.session_state.stroke_color = st.color_picker("Color:", "#000000")
         
-        # Canvas for drawing
+        if 'art_log' not in st.session_state:
+            st.session_state.art_log = StrokeLog(width=600, height=400)
+        art_log = st.session_state.art_log
+        
+        # Canvas for drawing; strokes stay in the browser until they are sent,
+        # so drawing does not rerun the page
         canvas_result = st_canvas(
             fill_color="rgba(255, 165, 0, 0.3)",
             stroke_width=st.session_state.stroke_width,
             stroke_color=st.session_state.stroke_color,
             background_color="#FFFFFF",
             background_image=None,
-            update_streamlit=True,
-            height=400,
+            update_streamlit=False,
+            width=art_log.width,
+            height=art_log.height,
             drawing_mode=st.session_state.drawing_mode,
             key="canvas",
         )
+        st.caption("Use the send button under the canvas to keep your strokes, then save the drawing.")
+        
+        # Only strokes changed since the last send are converted; the bitmap is ignored
+        if canvas_result.json_data is not None:
+            art_log.sync(canvas_result.json_data.get("objects", []))
+        
+        artworks = load_user_state('artworks', list)
+        if st.button("Save Drawing", disabled=not len(art_log)):
+            artworks.append({
+                'id': uuid.uuid4().hex,
+                'saved_at': datetime.now().isoformat(timespec="seconds"),
+                'drawing': art_log.to_records()
+            })
+            save_user_state('artworks')
+            st.success(f"Drawing saved ({len(art_log)} strokes)!")
+        
+        if artworks:
+            st.subheader("Your Gallery")
+        
+            def render_artwork(artwork):
+                st.image(drawing_png(artwork['drawing'], max_size=240), caption=f"Saved {artwork['saved_at']}")
+                st.download_button(
+                    "Download PNG",
+                    data=drawing_png(artwork['drawing']),
+                    file_name=f"drawing-{artwork['saved_at']}.png",
+                    mime="image/png",
+                    key=f"download_{artwork['id']}"
+                )
+        
+            paginated_list("artworks", list_page_fetcher(artworks), render_artwork, page_size=4)
 
     
     elif activity == "Sound Therapy":
         st.subheader("🎵 Therapeutic Sounds")
         
-        # Sound options with file paths
-        sounds = {
-            "Ocean Waves": audio_dir / "ocean.mp3",
-            "Forest Birds": audio_dir / "forest.mp3",
-            "Rainfall": audio_dir / "rain.mp3"
+        # Generated on the fly (fresh every time); birdsong still needs a recording
+        soundscapes = {
+            "Ocean Waves": "ocean",
+            "Rainfall": "rain",
+            "Pink Noise": "pink",
+            "Brown Noise": "brown",
+            "White Noise": "white"
+        }
+        recordings = {
+            "Forest Birds": "forest.mp3"
         }
         
         col1, col2 = st.columns(2)
         with col1:
-            selected_sound = st.selectbox("Choose a sound:", list(sounds.keys()))
+            selected_sound = st.selectbox("Choose a sound:", list(soundscapes) + list(recordings))
+            if selected_sound in soundscapes:
+                drift_to = st.selectbox(
+                    "Then drift into:",
+                    ["Stay with this sound"] + [name for name in soundscapes if name != selected_sound]
+                )
             
         with col2:
             st.markdown("### Sound Settings")
             volume = st.slider("Volume:", 0.0, 1.0, 0.5)
             
         if st.button("Play Sound"):
-            try:
-                with open(sounds[selected_sound], "rb") as audio_file:
-                    audio_bytes = audio_file.read()
-                    st.audio(audio_bytes, format="audio/mp3")
-            except FileNotFoundError:
-                st.error(f"Audio file for {selected_sound} not found. Please ensure it exists in the assets directory.")
+            if selected_sound in soundscapes:
+                seconds = int(get_setting("SOUNDSCAPE_SECONDS", 60))
+
+                def build_soundscape(sample_rate):
+                    soundscape = Soundscape(soundscapes[selected_sound], volume=volume, sample_rate=sample_rate)
+                    if drift_to in soundscapes:
+                        soundscape.crossfade_to(soundscapes[drift_to], seconds=seconds / 4, after=seconds / 3)
+                    return soundscape
+
+                # Encoded at AUDIO_STREAM_BITRATE, a minute is about 0.5 MB instead of 2.6 MB of WAV
+                clip = get_audio_library().encode(build_soundscape(22050).chunks(seconds))
+                if clip is None:
+                    # No ffmpeg: a shorter, lower-rate WAV keeps the page payload under a megabyte
+                    seconds = min(seconds, 30)
+                    clip = build_soundscape(16000).clip(seconds), "audio/wav"
+                st.audio(clip[0], format=clip[1])
+            else:
+                sound = get_audio_library().get(recordings[selected_sound])
+                if sound is None:
+                    st.error(f"Audio file for {selected_sound} not found. Please ensure it exists in the assets directory.")
+                else:
+                    st.audio(sound.data, format=sound.mime)
 
     
 
@@ -1037,4 +1684,10 @@ def therapeutic_activities_page():
 
 
 if __name__=="__main__":
-    main()
+    configure()
+    # Not a cached function: st.cache_* calls render a spinner element, and
+    # nothing may render before init_styles() calls st.set_page_config.
+    # Only the first rerun applies the setting; the Admin page can change it after
+    default_profiler.configure(int(get_setting("PROFILE_SAMPLE_EVERY", 0)))
+    with default_profiler.profile_rerun():
+        main()
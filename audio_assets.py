@@ -0,0 +1,195 @@
+"""Process-wide cache of the app's audio assets.
+
+Each track is read from disk once and kept in memory, so reruns hand
+st.audio the same bytes without touching the disk. Streamlit serves those
+bytes from its media endpoint by URL, with range requests, instead of in
+the page payload. When ffmpeg is available, a low-bitrate mono variant of
+every track is transcoded once in the background (and kept on disk across
+restarts), and served in place of the original as soon as it is ready.
+encode() uses the same settings for audio generated on the fly. Missing
+files, or no ffmpeg at all, are handled quietly.
+"""
+import hashlib
+import os
+import shutil
+import subprocess
+import threading
+from collections import namedtuple
+
+AudioAsset = namedtuple("AudioAsset", ["data", "mime", "variant"])
+
+_MIME = {".mp3": "audio/mpeg", ".wav": "audio/wav", ".ogg": "audio/ogg"}
+
+
+class AudioLibrary:
+    def __init__(self, root, cache_dir="data/audio_cache", bitrate="64k", ffmpeg=None):
+        self.root = root
+        self.cache_dir = cache_dir
+        self.bitrate = bitrate
+        self.ffmpeg = ffmpeg or shutil.which("ffmpeg")
+        self._assets = {}  # (name, variant) -> (mtime_ns, AudioAsset)
+        self._variant_paths = {}  # name -> (original AudioAsset, variant path), so data is hashed once
+        self._transcoding = set()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "disk_reads": 0, "missing": 0, "transcoded": 0, "transcode_errors": 0,
+                       "encoded": 0, "encode_errors": 0}
+
+    def names(self):
+        try:
+            return sorted(n for n in os.listdir(self.root) if os.path.splitext(n)[1] in _MIME)
+        except OSError:
+            return []
+
+    def _load(self, name, variant, path, mime):
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        with self._lock:
+            cached = self._assets.get((name, variant))
+            if cached and cached[0] == mtime:
+                self._stats["hits"] += 1
+                return cached[1]
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        asset = AudioAsset(data, mime, variant)
+        with self._lock:
+            self._assets[(name, variant)] = (mtime, asset)
+            self._stats["disk_reads"] += 1
+        return asset
+
+    def _variant_path(self, name, original):
+        cached = self._variant_paths.get(name)
+        if cached and cached[0] is original:
+            return cached[1]
+        digest = hashlib.blake2b(original.data, digest_size=8).hexdigest()
+        path = os.path.join(self.cache_dir, f"{os.path.splitext(name)[0]}-{digest}-{self.bitrate}.mp3")
+        self._variant_paths[name] = (original, path)
+        return path
+
+    def get(self, name, low_bitrate=True):
+        """Return the AudioAsset for name, or None if the file is not there.
+
+        With low_bitrate, the transcoded variant is returned once it exists;
+        until then the original is, and transcoding is started.
+        """
+        original = self._load(name, "original", os.path.join(self.root, name), _MIME.get(os.path.splitext(name)[1]))
+        if original is None:
+            with self._lock:
+                self._stats["missing"] += 1
+            return None
+        if not low_bitrate or not self.ffmpeg:
+            return original
+
+        variant_path = self._variant_path(name, original)
+        variant = self._load(name, self.bitrate, variant_path, "audio/mpeg")
+        if variant is not None:
+            return variant
+        self.transcode_async(name, original.data, variant_path)
+        return original
+
+    def transcode_async(self, name, data, variant_path):
+        with self._lock:
+            if name in self._transcoding:
+                return
+            self._transcoding.add(name)
+        threading.Thread(target=self._transcode, args=(name, data, variant_path),
+                         name=f"transcode-{name}", daemon=True).start()
+
+    def _transcode(self, name, data, variant_path):
+        tmp_path = f"{variant_path}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            subprocess.run(
+                [self.ffmpeg, "-v", "error", "-y", "-i", "pipe:0", "-ac", "1", "-b:a", self.bitrate,
+                 "-f", "mp3", tmp_path],
+                input=data, check=True, timeout=300, capture_output=True,
+            )
+            os.replace(tmp_path, variant_path)
+            with self._lock:
+                self._stats["transcoded"] += 1
+        except (OSError, subprocess.SubprocessError):
+            with self._lock:
+                self._stats["transcode_errors"] += 1
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+        finally:
+            with self._lock:
+                self._transcoding.discard(name)
+
+    def encode(self, chunks, timeout=120):
+        """MP3-encode a WAV stream given as byte chunks; an AudioAsset, or None without ffmpeg or on failure.
+
+        Chunks are piped to ffmpeg as they are produced, so a generator is
+        encoded while it is still generating.
+        """
+        if not self.ffmpeg:
+            return None
+        try:
+            process = subprocess.Popen(
+                [self.ffmpeg, "-v", "error", "-f", "wav", "-i", "pipe:0", "-ac", "1", "-b:a", self.bitrate,
+                 "-f", "mp3", "pipe:1"],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            )
+        except OSError:
+            with self._lock:
+                self._stats["encode_errors"] += 1
+            return None
+
+        def feed():
+            try:
+                for chunk in chunks:
+                    process.stdin.write(chunk)
+            except (OSError, ValueError):
+                pass  # ffmpeg exited early; its return code reports why
+            finally:
+                try:
+                    process.stdin.close()
+                except OSError:
+                    pass
+
+        output = []
+
+        def drain():
+            output.append(process.stdout.read())
+
+        # Feed and drain on their own threads, so neither a full pipe nor a hung
+        # ffmpeg can block us past the timeout
+        writer = threading.Thread(target=feed, name="audio-encode-in", daemon=True)
+        reader = threading.Thread(target=drain, name="audio-encode-out", daemon=True)
+        writer.start()
+        reader.start()
+        reader.join(timeout)
+        if reader.is_alive():
+            process.kill()
+            reader.join(timeout=1)
+        try:
+            process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            pass
+        writer.join(timeout=1)
+        data = output[0] if output else b""
+        ok = process.returncode == 0 and bool(data)
+        with self._lock:
+            self._stats["encoded" if ok else "encode_errors"] += 1
+        return AudioAsset(data, "audio/mpeg", self.bitrate) if ok else None
+
+    def prepare_all(self):
+        """Load every asset and start transcoding any that have no low-bitrate variant yet."""
+        for name in self.names():
+            self.get(name)
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self._stats,
+                "cached": len(self._assets),
+                "cached_bytes": sum(len(asset.data) for _, asset in self._assets.values()),
+                "transcoding": len(self._transcoding),
+                "ffmpeg": bool(self.ffmpeg),
+            }
@@ -0,0 +1,234 @@
+"""Non-blocking microphone capture into per-session ring buffers.
+
+A capture pulls float32 mono frames from a source on the source's own
+thread and writes them into a fixed-size ring buffer, so the Streamlit
+script is free while the user talks. The result is handed over as an
+in-memory WAV buffer; nothing is written to disk.
+"""
+import io
+import threading
+import time
+import wave
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+
+class RingBuffer:
+    """Fixed-capacity float32 buffer that keeps the most recent samples."""
+
+    def __init__(self, capacity, dtype=np.float32):
+        self._data = np.zeros(capacity, dtype=dtype)
+        self._capacity = capacity
+        self._write = 0
+        self._size = 0
+        self._lock = threading.Lock()
+        self.total_written = 0
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    def __len__(self):
+        return self._size
+
+    def write(self, frames):
+        frames = np.asarray(frames, dtype=self._data.dtype).reshape(-1)
+        if len(frames) > self._capacity:
+            frames = frames[-self._capacity:]
+        n = len(frames)
+
+        with self._lock:
+            end = self._write + n
+            if end <= self._capacity:
+                self._data[self._write:end] = frames
+            else:
+                first = self._capacity - self._write
+                self._data[self._write:] = frames[:first]
+                self._data[:n - first] = frames[first:]
+            self._write = end % self._capacity
+            self._size = min(self._capacity, self._size + n)
+            self.total_written += n
+
+    def read(self):
+        """Return the buffered samples, oldest first."""
+        with self._lock:
+            if self._size < self._capacity:
+                return self._data[:self._size].copy()
+            return np.concatenate((self._data[self._write:], self._data[:self._write]))
+
+    def clear(self):
+        with self._lock:
+            self._write = 0
+            self._size = 0
+
+
+def pcm16_wav_buffer(samples, sample_rate=SAMPLE_RATE):
+    """Encode float samples in [-1, 1] as a 16-bit mono WAV in a BytesIO."""
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16)
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)  # 2 bytes per sample for 16-bit audio
+        wf.setframerate(sample_rate)
+        wf.writeframes(pcm.tobytes())
+    buffer.seek(0)
+    return buffer
+
+
+def read_wav_samples(path_or_buffer):
+    """Load a 16-bit PCM WAV as mono float32 samples and its sample rate."""
+    with wave.open(path_or_buffer, 'rb') as wf:
+        sample_rate = wf.getframerate()
+        channels = wf.getnchannels()
+        pcm = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+    if channels > 1:
+        pcm = pcm.reshape(-1, channels).mean(axis=1)
+    return pcm.astype(np.float32) / 32768.0, sample_rate
+
+
+class MicrophoneSource:
+    """Frames from the default input device via a sounddevice callback stream."""
+
+    def __init__(self, sample_rate=SAMPLE_RATE, blocksize=1600):
+        self.sample_rate = sample_rate
+        self.blocksize = blocksize
+        self._stream = None
+
+    def start(self, consumer):
+        import sounddevice as sd
+
+        def callback(indata, frames, time_info, status):
+            if consumer(indata[:, 0].copy()) is False:
+                raise sd.CallbackStop
+
+        self._stream = sd.InputStream(
+            samplerate=self.sample_rate, channels=1, dtype='float32',
+            blocksize=self.blocksize, callback=callback
+        )
+        self._stream.start()
+
+    def stop(self):
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+
+class SyntheticSource:
+    """Headless stand-in for a microphone.
+
+    Plays back the given samples (or a quiet tone) block by block on a
+    background thread. realtime=False delivers blocks as fast as possible,
+    which is what tests and benchmarks want.
+    """
+
+    def __init__(self, samples=None, sample_rate=SAMPLE_RATE, blocksize=1600, realtime=True, loop=False):
+        if samples is None:
+            t = np.arange(sample_rate, dtype=np.float32) / sample_rate
+            samples = 0.2 * np.sin(2 * np.pi * 220 * t)
+        self.samples = np.asarray(samples, dtype=np.float32)
+        self.sample_rate = sample_rate
+        self.blocksize = blocksize
+        self.realtime = realtime
+        self.loop = loop
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_wav(cls, path, **kwargs):
+        samples, sample_rate = read_wav_samples(path)
+        return cls(samples, sample_rate=sample_rate, **kwargs)
+
+    def _run(self, consumer):
+        position = 0
+        block_seconds = self.blocksize / self.sample_rate
+        while not self._stop.is_set():
+            if position >= len(self.samples):
+                if not self.loop:
+                    consumer(None)  # tell the capture the input has run out
+                    break
+                position = 0
+            block = self.samples[position:position + self.blocksize]
+            position += self.blocksize
+            if consumer(block) is False:
+                break
+            if self.realtime:
+                time.sleep(block_seconds)
+
+    def start(self, consumer):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(consumer,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1)
+        self._thread = None
+
+
+class AudioCapture:
+    """One recording: a source feeding a ring buffer until stopped or full."""
+
+    def __init__(self, source, max_seconds=10):
+        self.source = source
+        self.sample_rate = source.sample_rate
+        self.buffer = RingBuffer(int(max_seconds * self.sample_rate))
+        self.listeners = []  # callables(frames) -> False to end the capture early
+        self.started_at = None
+        self.stop_reason = None
+        self._finished = threading.Event()
+
+    def _consume(self, frames):
+        if self._finished.is_set():
+            return False
+        if frames is None:
+            self._finish("source_ended")
+            return False
+
+        remaining = self.buffer.capacity - self.buffer.total_written
+        frames = frames[:remaining]
+        self.buffer.write(frames)
+
+        if self.buffer.total_written >= self.buffer.capacity:
+            self._finish("max_duration")
+            return False
+        for listener in self.listeners:
+            if listener(frames) is False:
+                self._finish("listener")
+                return False
+        return True
+
+    def _finish(self, reason):
+        if not self._finished.is_set():
+            self.stop_reason = reason
+            self._finished.set()
+
+    def start(self):
+        self.started_at = time.monotonic()
+        self.source.start(self._consume)
+        return self
+
+    def stop(self):
+        """End the capture early (or clean up after it ended on its own)."""
+        self._finish(self.stop_reason or "stopped")
+        self.source.stop()
+
+    @property
+    def is_active(self):
+        return self.started_at is not None and not self._finished.is_set()
+
+    @property
+    def duration(self):
+        return len(self.buffer) / self.sample_rate
+
+    def wait(self, timeout=None):
+        return self._finished.wait(timeout)
+
+    def samples(self):
+        return self.buffer.read()
+
+    def to_wav_buffer(self):
+        return pcm16_wav_buffer(self.samples(), self.sample_rate)
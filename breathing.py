@@ -0,0 +1,117 @@
+"""Declarative breathing exercises driven by elapsed wall-clock time.
+
+An exercise is a phase table plus a cycle count. Where the user is in an
+exercise is computed from the seconds elapsed since it started, so nothing
+has to sleep on the server: the page works out the current state on each
+rerun and a small browser-side timer animates the progress in between.
+"""
+import bisect
+import json
+from collections import namedtuple
+
+BreathingState = namedtuple(
+    "BreathingState",
+    ["phase", "phase_index", "phase_progress", "phase_remaining", "cycle", "progress", "done"],
+)
+
+
+class BreathingExercise:
+    def __init__(self, name, phases, cycles=4):
+        self.name = name
+        self.phases = tuple(phases)  # (label, seconds) pairs
+        self.cycles = cycles
+
+        # Cumulative end time of each phase within one cycle
+        self._phase_ends = []
+        total = 0
+        for _, seconds in self.phases:
+            total += seconds
+            self._phase_ends.append(total)
+        self.cycle_seconds = total
+        self.total_seconds = total * cycles
+
+    def state_at(self, elapsed):
+        """Return the BreathingState for a session that started elapsed seconds ago."""
+        if elapsed >= self.total_seconds:
+            label = self.phases[-1][0]
+            return BreathingState(label, len(self.phases) - 1, 1.0, 0.0, self.cycles, 1.0, True)
+
+        elapsed = max(0.0, elapsed)
+        cycle, offset = divmod(elapsed, self.cycle_seconds)
+        index = bisect.bisect_right(self._phase_ends, offset)
+        label, seconds = self.phases[index]
+        phase_start = self._phase_ends[index] - seconds
+        into_phase = offset - phase_start
+
+        return BreathingState(
+            phase=label,
+            phase_index=index,
+            phase_progress=into_phase / seconds,
+            phase_remaining=seconds - into_phase,
+            cycle=int(cycle) + 1,
+            progress=elapsed / self.total_seconds,
+            done=False,
+        )
+
+    def timer_html(self, elapsed):
+        """Self-contained HTML/JS that animates the exercise in the browser from elapsed seconds."""
+        config = json.dumps({
+            "phases": [[label, seconds] for label, seconds in self.phases],
+            "cycles": self.cycles,
+            "elapsedMs": int(elapsed * 1000),
+        })
+        return _TIMER_TEMPLATE.replace("__CONFIG__", config)
+
+
+BREATHING_EXERCISES = {
+    "Box Breathing": BreathingExercise(
+        "Box Breathing", [("Inhale", 4), ("Hold", 4), ("Exhale", 4), ("Hold", 4)]),
+    "4-7-8 Breathing": BreathingExercise(
+        "4-7-8 Breathing", [("Inhale", 4), ("Hold", 7), ("Exhale", 8)]),
+    "Deep Breathing": BreathingExercise(
+        "Deep Breathing", [("Inhale Deeply", 4), ("Hold", 2), ("Exhale Slowly", 4), ("Rest", 2)]),
+}
+
+
+_TIMER_TEMPLATE = """
+<style>
+    body { font-family: sans-serif; margin: 0; }
+    .timer-text { font-size: 3em; font-weight: bold; text-align: center; color: #2E7D32;
+                  text-shadow: 2px 2px 4px rgba(0,0,0,0.1); margin: 10px 0; }
+    .bar { background: #e8f0ee; border-radius: 8px; height: 10px; overflow: hidden; }
+    .fill { background: #236860; height: 100%; width: 0; }
+    .cycle { text-align: center; color: #555; margin-top: 8px; }
+</style>
+<p id="phase" class="timer-text"></p>
+<div class="bar"><div id="fill" class="fill"></div></div>
+<p id="cycle" class="cycle"></p>
+<script>
+    const config = __CONFIG__;
+    const cycleSeconds = config.phases.reduce((sum, p) => sum + p[1], 0);
+    const totalSeconds = cycleSeconds * config.cycles;
+    const startedAt = performance.now() - config.elapsedMs;
+
+    function tick() {
+        const elapsed = (performance.now() - startedAt) / 1000;
+        if (elapsed >= totalSeconds) {
+            document.getElementById("phase").textContent = "Done";
+            document.getElementById("fill").style.width = "100%";
+            document.getElementById("cycle").textContent =
+                "✨ Exercise completed! Take a moment to notice how you feel.";
+            return;
+        }
+        const cycle = Math.floor(elapsed / cycleSeconds);
+        let offset = elapsed - cycle * cycleSeconds;
+        let i = 0;
+        while (offset >= config.phases[i][1]) {
+            offset -= config.phases[i][1];
+            i++;
+        }
+        document.getElementById("phase").textContent = config.phases[i][0];
+        document.getElementById("fill").style.width = (100 * offset / config.phases[i][1]) + "%";
+        document.getElementById("cycle").textContent = "Cycle " + (cycle + 1) + " of " + config.cycles;
+        setTimeout(tick, 100);
+    }
+    tick();
+</script>
+"""
@@ -0,0 +1,109 @@
+"""Per-session conversation memory kept under a fixed token budget.
+
+Recent turns are kept verbatim. When the history would push a request over
+the budget, the oldest turns are folded into a running summary, so request
+size stays flat however long the session gets. Token counts are estimated
+(about four characters per token), which is close enough for budgeting.
+"""
+import math
+import re
+
+
+def estimate_tokens(text):
+    return max(1, math.ceil(len(text) / 4)) if text else 0
+
+
+def _first_sentence(text, max_chars=160):
+    sentence = re.split(r"(?<=[.!?])\s", text.strip(), maxsplit=1)[0]
+    return sentence if len(sentence) <= max_chars else sentence[:max_chars].rstrip() + "…"
+
+
+def extractive_summary(previous, turns, max_tokens):
+    """Cheap summarizer: keep the first sentence of each folded turn, newest last."""
+    lines = [previous] if previous else []
+    for turn in turns:
+        speaker = "User" if turn.role == "user" else "Therapist"
+        lines.append(f"{speaker}: {_first_sentence(turn.content)}")
+    summary = " ".join(lines)
+
+    # Drop the oldest material first once the summary itself is over budget
+    max_chars = max_tokens * 4
+    if len(summary) > max_chars:
+        summary = "…" + summary[-max_chars:]
+    return summary
+
+
+class Turn:
+    __slots__ = ("role", "content", "tokens")
+
+    def __init__(self, role, content):
+        self.role = role
+        self.content = content
+        self.tokens = estimate_tokens(content)
+
+
+class ConversationStore:
+    def __init__(self, budget_tokens=1200, keep_recent=4, summary_tokens=250, summarizer=extractive_summary):
+        self.budget_tokens = budget_tokens
+        self.keep_recent = keep_recent
+        self.summary_tokens = summary_tokens
+        self.summarizer = summarizer
+        self.turns = []
+        self.summary = ""
+        self.compactions = 0
+        self.total_turns = 0
+
+    def add(self, role, content):
+        self.turns.append(Turn(role, content))
+        self.total_turns += 1
+
+    @property
+    def history_tokens(self):
+        return estimate_tokens(self.summary) + sum(turn.tokens for turn in self.turns)
+
+    def compact(self, reserve_tokens=0):
+        """Fold the oldest turns into the summary until history plus reserve_tokens fits the budget.
+
+        The keep_recent newest turns are never folded.
+        """
+        if self.history_tokens + reserve_tokens <= self.budget_tokens:
+            return 0
+
+        folded = []
+        recent_tokens = sum(turn.tokens for turn in self.turns)
+        # The new summary is capped at summary_tokens, so budget for that much
+        while (len(self.turns) > self.keep_recent
+               and recent_tokens + self.summary_tokens + reserve_tokens > self.budget_tokens):
+            turn = self.turns.pop(0)
+            recent_tokens -= turn.tokens
+            folded.append(turn)
+
+        if folded:
+            self.summary = self.summarizer(self.summary, folded, self.summary_tokens)
+            self.compactions += 1
+        return len(folded)
+
+    def render_context(self):
+        """Summary and recent turns formatted for inclusion in a prompt."""
+        parts = []
+        if self.summary:
+            parts.append(f"Summary of the earlier conversation: {self.summary}")
+        if self.turns:
+            parts.append("Recent conversation:")
+            for turn in self.turns:
+                speaker = "User" if turn.role == "user" else "Therapist"
+                parts.append(f"{speaker}: {turn.content}")
+        return "\n".join(parts)
+
+    def clear(self):
+        self.turns = []
+        self.summary = ""
+
+    def stats(self):
+        return {
+            "turns_kept": len(self.turns),
+            "total_turns": self.total_turns,
+            "history_tokens": self.history_tokens,
+            "budget_tokens": self.budget_tokens,
+            "compactions": self.compactions,
+        }
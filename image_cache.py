@@ -0,0 +1,182 @@
+"""Local, content-addressed cache for remote images.
+
+Images are downloaded once, downscaled to fit max_dimension and re-encoded,
+then stored on disk under a BLAKE2b digest of the original bytes, so the
+same picture reached through different URLs is stored once. The cache
+directory is capped at max_bytes, evicting the least recently used images
+first. The app serves the cached bytes itself, so browsers never fetch the
+full-size original from third-party hosts.
+"""
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+import requests
+from PIL import Image, UnidentifiedImageError
+
+_MIME = {".jpg": "image/jpeg", ".png": "image/png", ".gif": "image/gif"}
+
+
+def image_digest(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def downscale(data, max_dimension=800, quality=80):
+    """Return (bytes, extension) for data shrunk to fit max_dimension.
+
+    Animated GIFs are kept as they are; images with transparency become PNG
+    and everything else JPEG.
+    """
+    with Image.open(io.BytesIO(data)) as image:
+        if getattr(image, "n_frames", 1) > 1:
+            return data, ".gif"
+        # Lets the JPEG decoder skip detail we are about to throw away
+        image.draft("RGB", (max_dimension, max_dimension))
+        image.thumbnail((max_dimension, max_dimension))
+        output = io.BytesIO()
+        if image.mode in ("RGBA", "LA", "P") and (image.mode != "P" or "transparency" in image.info):
+            image.save(output, "PNG", optimize=True)
+            return output.getvalue(), ".png"
+        image.convert("RGB").save(output, "JPEG", quality=quality, optimize=True)
+        return output.getvalue(), ".jpg"
+
+
+class ImageCache:
+    def __init__(self, cache_dir="data/image_cache", max_bytes=64 * 1024 * 1024, max_dimension=800,
+                 quality=80, max_download_bytes=15 * 1024 * 1024, timeout=10, session=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_dimension = max_dimension
+        self.quality = quality
+        self.max_download_bytes = max_download_bytes
+        self.timeout = timeout
+        self.session = session or requests.Session()
+
+        self._files = OrderedDict()  # file name -> size, least recently used first
+        self._urls = OrderedDict()  # url -> file name
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "duplicates": 0, "evictions": 0, "errors": 0,
+                       "bytes_downloaded": 0, "bytes_stored": 0}
+
+        os.makedirs(cache_dir, exist_ok=True)
+        # Pick up images from earlier runs, oldest access first
+        existing = []
+        for entry in os.scandir(cache_dir):
+            if entry.is_file() and os.path.splitext(entry.name)[1] in _MIME:
+                stat = entry.stat()
+                existing.append((stat.st_mtime, entry.name, stat.st_size))
+        for _, name, size in sorted(existing):
+            self._files[name] = size
+            self._bytes += size
+        self._evict()
+
+    def _path(self, name):
+        return os.path.join(self.cache_dir, name)
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and len(self._files) > 1:
+            name, size = self._files.popitem(last=False)
+            self._bytes -= size
+            self._stats["evictions"] += 1
+            try:
+                os.remove(self._path(name))
+            except OSError:
+                pass
+
+    def _read(self, name):
+        """Bytes of a cached file, marking it recently used; None if it has gone."""
+        try:
+            with open(self._path(name), "rb") as f:
+                data = f.read()
+            os.utime(self._path(name))
+        except OSError:
+            with self._lock:
+                self._bytes -= self._files.pop(name, 0)
+            return None
+        with self._lock:
+            if name in self._files:
+                self._files.move_to_end(name)
+        return data
+
+    def _download(self, url):
+        with self.session.get(url, timeout=self.timeout, stream=True) as response:
+            response.raise_for_status()
+            chunks, total = [], 0
+            for chunk in response.iter_content(64 * 1024):
+                total += len(chunk)
+                if total > self.max_download_bytes:
+                    raise ValueError(f"image larger than {self.max_download_bytes} bytes")
+                chunks.append(chunk)
+        return b"".join(chunks)
+
+    def get(self, url):
+        """Return (bytes, mime) for the image at url, or None if it cannot be fetched or decoded."""
+        with self._lock:
+            name = self._urls.get(url)
+            if name is not None:
+                self._urls.move_to_end(url)
+        if name is not None:
+            data = self._read(name)
+            if data is not None:
+                with self._lock:
+                    self._stats["hits"] += 1
+                return data, _MIME[os.path.splitext(name)[1]]
+
+        try:
+            original = self._download(url)
+        except (requests.RequestException, ValueError):
+            with self._lock:
+                self._stats["errors"] += 1
+            return None
+
+        digest = image_digest(original)
+        with self._lock:
+            self._stats["misses"] += 1
+            self._stats["bytes_downloaded"] += len(original)
+            cached = next((n for n in (f"{digest}{ext}" for ext in _MIME) if n in self._files), None)
+        if cached is not None:
+            # Same picture under another URL
+            data = self._read(cached)
+            if data is not None:
+                with self._lock:
+                    self._stats["duplicates"] += 1
+                    self._remember_url(url, cached)
+                return data, _MIME[os.path.splitext(cached)[1]]
+
+        try:
+            data, ext = downscale(original, self.max_dimension, self.quality)
+        except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+            with self._lock:
+                self._stats["errors"] += 1
+            return None
+
+        name = f"{digest}{ext}"
+        tmp_path = f"{self._path(name)}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(name))
+        except OSError:
+            return data, _MIME[ext]  # caching is best effort; still serve the downscaled copy
+
+        with self._lock:
+            if name not in self._files:
+                self._files[name] = len(data)
+                self._bytes += len(data)
+                self._stats["bytes_stored"] += len(data)
+            self._remember_url(url, name)
+            self._evict()
+        return data, _MIME[ext]
+
+    def _remember_url(self, url, name):
+        self._urls[url] = name
+        self._urls.move_to_end(url)
+        while len(self._urls) > 4096:
+            self._urls.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, "entries": len(self._files), "bytes": self._bytes, "max_bytes": self.max_bytes}
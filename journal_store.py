@@ -0,0 +1,192 @@
+"""Durable journal entries in SQLite with indexed full-text search.
+
+Entries are stored per user. Search uses an FTS5 table kept in sync by
+triggers when the SQLite build supports it, and otherwise falls back to a
+term -> entry inverted index maintained on every insert and delete. Either
+way a query touches only the index, never every entry.
+"""
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from datetime import datetime
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text):
+    return _WORD.findall(text.lower())
+
+
+class JournalStore:
+    def __init__(self, path="data/journal.db"):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    id INTEGER PRIMARY KEY,
+                    user_id TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    body TEXT NOT NULL
+                )""")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_user ON entries (user_id, id)")
+            self.uses_fts = self._create_fts()
+            if not self.uses_fts:
+                self._conn.execute("""
+                    CREATE TABLE IF NOT EXISTS terms (
+                        user_id TEXT NOT NULL,
+                        term TEXT NOT NULL,
+                        entry_id INTEGER NOT NULL,
+                        tf INTEGER NOT NULL,
+                        PRIMARY KEY (user_id, term, entry_id)
+                    ) WITHOUT ROWID""")
+
+    def _create_fts(self):
+        try:
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts "
+                "USING fts5(body, content='entries', content_rowid='id')"
+            )
+        except sqlite3.OperationalError:
+            return False
+        self._conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS entries_ai AFTER INSERT ON entries BEGIN
+                INSERT INTO entries_fts (rowid, body) VALUES (new.id, new.body);
+            END""")
+        self._conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS entries_ad AFTER DELETE ON entries BEGIN
+                INSERT INTO entries_fts (entries_fts, rowid, body) VALUES ('delete', old.id, old.body);
+            END""")
+        return True
+
+    def add(self, user_id, body, created_at=None):
+        """Save an entry and return its id."""
+        created_at = created_at or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO entries (user_id, created_at, body) VALUES (?, ?, ?)",
+                (user_id, created_at, body),
+            )
+            entry_id = cursor.lastrowid
+            if not self.uses_fts:
+                self._conn.executemany(
+                    "INSERT INTO terms (user_id, term, entry_id, tf) VALUES (?, ?, ?, ?)",
+                    [(user_id, term, entry_id, tf) for term, tf in Counter(tokenize(body)).items()],
+                )
+        return entry_id
+
+    def delete(self, user_id, entry_id):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries WHERE user_id = ? AND id = ?", (user_id, entry_id))
+            if not self.uses_fts:
+                self._conn.execute("DELETE FROM terms WHERE user_id = ? AND entry_id = ?", (user_id, entry_id))
+
+    def clear(self, user_id):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries WHERE user_id = ?", (user_id,))
+            if not self.uses_fts:
+                self._conn.execute("DELETE FROM terms WHERE user_id = ?", (user_id,))
+
+    def count(self, user_id):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM entries WHERE user_id = ?", (user_id,)
+            ).fetchone()[0]
+
+    def recent(self, user_id, limit=10, offset=0):
+        """Newest entries first, as (id, created_at, body) rows."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, created_at, body FROM entries WHERE user_id = ? "
+                "ORDER BY id DESC LIMIT ? OFFSET ?",
+                (user_id, limit, offset),
+            ).fetchall()
+
+    def page(self, user_id, query="", cursor=None, limit=10):
+        """One page of entries as (rows, next_cursor); next_cursor is None on the last page.
+
+        Without a query, pages walk back from the newest entry by id, so each
+        page is an index range scan no matter how deep it is. Ranked search
+        results page by position.
+        """
+        if tokenize(query):
+            offset = cursor or 0
+            rows, total = self.search(user_id, query, limit, offset)
+            return rows, (offset + limit if offset + limit < total else None)
+
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, created_at, body FROM entries WHERE user_id = ? AND id < ? "
+                "ORDER BY id DESC LIMIT ?",
+                (user_id, cursor if cursor is not None else 2 ** 63 - 1, limit + 1),
+            ).fetchall()
+        if len(rows) > limit:
+            return rows[:limit], rows[limit - 1][0]
+        return rows, None
+
+    def search(self, user_id, query, limit=10, offset=0):
+        """Best-matching entries for query as ((id, created_at, body) rows, total matches).
+
+        Every word in the query must match; the last one may be a prefix, so
+        results narrow sensibly while the user is still typing.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return self.recent(user_id, limit, offset), self.count(user_id)
+        if self.uses_fts:
+            return self._search_fts(user_id, terms, limit, offset)
+        return self._search_index(user_id, terms, limit, offset)
+
+    def _search_fts(self, user_id, terms, limit, offset):
+        match = " AND ".join(f'"{term}"' for term in terms[:-1])
+        match = f'{match} AND "{terms[-1]}"*' if match else f'"{terms[-1]}"*'
+        # CROSS JOIN keeps the FTS match as the outer loop; a plain JOIN lets the
+        # planner scan entries and re-run the match for each row
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT e.id, e.created_at, e.body FROM entries_fts "
+                "CROSS JOIN entries e ON e.id = entries_fts.rowid "
+                "WHERE entries_fts MATCH ? AND e.user_id = ? "
+                "ORDER BY bm25(entries_fts), e.id DESC LIMIT ? OFFSET ?",
+                (match, user_id, limit, offset),
+            ).fetchall()
+            total = self._conn.execute(
+                "SELECT COUNT(*) FROM entries_fts CROSS JOIN entries e ON e.id = entries_fts.rowid "
+                "WHERE entries_fts MATCH ? AND e.user_id = ?",
+                (match, user_id),
+            ).fetchone()[0]
+        return rows, total
+
+    def _search_index(self, user_id, terms, limit, offset):
+        # One branch per query word; the last word matches as a prefix
+        branches, params = [], []
+        for i, term in enumerate(terms):
+            if i == len(terms) - 1:
+                branches.append(f"SELECT {i} AS q, entry_id, tf FROM terms "
+                                "WHERE user_id = ? AND term >= ? AND term < ?")
+                params.extend([user_id, term, term + "\uffff"])
+            else:
+                branches.append(f"SELECT {i} AS q, entry_id, tf FROM terms WHERE user_id = ? AND term = ?")
+                params.extend([user_id, term])
+        matches = (
+            f"WITH hits AS ({' UNION ALL '.join(branches)}) "
+            "SELECT entry_id, SUM(tf) AS score FROM hits GROUP BY entry_id "
+            f"HAVING COUNT(DISTINCT q) = {len(terms)}"
+        )
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT e.id, e.created_at, e.body FROM ({matches}) m JOIN entries e ON e.id = m.entry_id "
+                "ORDER BY m.score DESC, e.id DESC LIMIT ? OFFSET ?",
+                params + [limit, offset],
+            ).fetchall()
+            total = self._conn.execute(f"SELECT COUNT(*) FROM ({matches})", params).fetchone()[0]
+        return rows, total
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
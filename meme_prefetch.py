@@ -0,0 +1,250 @@
+"""Background meme prefetching over a pooled HTTP session.
+
+A worker thread keeps a small buffer of ready meme metadata topped up,
+asking the API for as many memes as are missing in one request. Clicks are
+served straight from the buffer, so the only wait is when it has run dry.
+All requests share one keep-alive session, so refills skip the TCP and TLS
+handshakes after the first.
+"""
+import json
+import struct
+import threading
+import time
+import zlib
+from collections import deque, namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from requests.adapters import HTTPAdapter
+
+Meme = namedtuple("Meme", ["image_url", "title", "post_link"])
+
+# meme-api.com returns at most this many memes per request
+MAX_BATCH = 50
+
+
+class MemeUnavailable(Exception):
+    pass
+
+
+def parse_memes(data):
+    """Memes from either a single-meme response or a {"memes": [...]} batch."""
+    items = data.get("memes", [data]) if isinstance(data, dict) else []
+    return [
+        Meme(item["url"], item.get("title") or "No caption available.", item.get("postLink"))
+        for item in items
+        if isinstance(item, dict) and item.get("url")
+    ]
+
+
+class MemePrefetcher:
+    def __init__(self, api_url="https://meme-api.com/gimme", buffer_size=5, timeout=10, max_backoff=30.0,
+                 prepare=None):
+        self.api_url = api_url.rstrip("/")
+        self.buffer_size = buffer_size
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+        # Called with each meme on the worker thread before it is buffered (e.g. to cache its image),
+        # unless a click is already waiting for it
+        self.prepare = prepare
+
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = "talk-tuah-therapist/1.0"
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=2)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._buffer = deque()
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._thread = None
+        self._stopping = False
+        self._last_error = None
+        self._waiting = 0
+        self._stats = {"requests": 0, "fetched": 0, "errors": 0, "served": 0, "served_from_buffer": 0}
+
+    def _fetch(self, count):
+        url = self.api_url if count == 1 else f"{self.api_url}/{count}"
+        response = self.session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        return parse_memes(response.json())
+
+    def _run(self):
+        failures = 0
+        while True:
+            with self._lock:
+                while not self._stopping and len(self._buffer) >= self.buffer_size:
+                    self._changed.wait()
+                if self._stopping:
+                    return
+                needed = min(MAX_BATCH, self.buffer_size - len(self._buffer))
+                self._stats["requests"] += 1
+
+            try:
+                memes = self._fetch(needed)
+                if not memes:
+                    raise ValueError("meme API returned no memes")
+            except (requests.RequestException, ValueError) as e:
+                failures += 1
+                with self._lock:
+                    self._stats["errors"] += 1
+                    self._last_error = str(e)
+                    # Wake waiting clicks so they can report the error, then back off
+                    self._changed.notify_all()
+                    self._changed.wait(min(self.max_backoff, 0.5 * 2 ** failures))
+                continue
+
+            failures = 0
+            with self._lock:
+                self._stats["fetched"] += len(memes)
+                self._last_error = None
+            # Buffer each meme as soon as it is prepared, so one slow image does not hold back the batch
+            for meme in memes:
+                with self._lock:
+                    # A click is already waiting: hand the meme over now and let it load the image itself
+                    rush = self._waiting > len(self._buffer)
+                if self.prepare is not None and not rush:
+                    try:
+                        self.prepare(meme)
+                    except Exception:
+                        pass  # best effort; the meme is still worth serving
+                with self._lock:
+                    if self._stopping:
+                        return
+                    self._buffer.append(meme)
+                    self._changed.notify_all()
+
+    def warm(self):
+        """Start filling the buffer if it is not already being filled."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="meme-prefetch", daemon=True)
+                self._thread.start()
+
+    def get(self, timeout=10):
+        """Return the next Meme, waiting up to timeout seconds if the buffer is empty.
+
+        Raises MemeUnavailable if nothing arrives in time.
+        """
+        self.warm()
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            from_buffer = bool(self._buffer)
+            self._waiting += 1
+            try:
+                while not self._buffer:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise MemeUnavailable(self._last_error or "timed out waiting for a meme")
+                    self._changed.wait(remaining)
+                    if not self._buffer and self._last_error:
+                        raise MemeUnavailable(self._last_error)
+            finally:
+                self._waiting -= 1
+            meme = self._buffer.popleft()
+            self._stats["served"] += 1
+            self._stats["served_from_buffer"] += from_buffer
+            self._changed.notify_all()
+            return meme
+
+    def shutdown(self):
+        with self._lock:
+            self._stopping = True
+            self._changed.notify_all()
+        self.session.close()
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, "buffered": len(self._buffer), "last_error": self._last_error}
+
+
+def _solid_png(width, height, rgb):
+    """A tiny solid-colour PNG, so the stub needs no image library."""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    row = b"\x00" + bytes(rgb) * width
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(row * height))
+            + chunk(b"IEND", b""))
+
+
+class StubMemeServer:
+    """Local stand-in for meme-api.com.
+
+    Answers GET /gimme and /gimme/<count> in the real API's shape, with image
+    URLs pointing back at /images/<n>.png on this server; n cycles through
+    distinct images so repeats can be tested. Use as a context manager and
+    set MEME_API_URL to f"{server.url}/gimme".
+    """
+
+    def __init__(self, distinct_images=8, delay=0.0, host="127.0.0.1", port=0):
+        self.distinct_images = distinct_images
+        self.delay = delay
+        self.requests = 0
+        self._next = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _send(self, body, content_type):
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                stub.requests += 1
+                time.sleep(stub.delay)
+                parts = self.path.strip("/").split("/")
+                if parts[0] == "images" and len(parts) == 2:
+                    n = int(parts[1].split(".")[0])
+                    colour = ((n * 67) % 256, (n * 131) % 256, (n * 29) % 256)
+                    self._send(_solid_png(640, 480, colour), "image/png")
+                elif parts[0] == "gimme":
+                    count = int(parts[1]) if len(parts) > 1 else 1
+                    memes = [stub._meme() for _ in range(count)]
+                    data = {"count": count, "memes": memes} if len(parts) > 1 else memes[0]
+                    self._send(json.dumps(data).encode(), "application/json")
+                else:
+                    self.send_response(404)
+                    self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._thread = None
+
+    def _meme(self):
+        n = self._next % self.distinct_images
+        self._next += 1
+        return {"title": f"Stub meme {n}", "url": f"{self.url}/images/{n}.png", "postLink": f"{self.url}/post/{n}"}
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+if __name__ == "__main__":
+    # Serve the stub on a fixed port for manual runs: MEME_API_URL=http://127.0.0.1:8766/gimme
+    with StubMemeServer(port=8766) as server:
+        print(f"Stub meme API listening on {server.url}/gimme")
+        threading.Event().wait()
@@ -0,0 +1,507 @@
+"""Asyncio client layer for the generative model providers.
+
+AsyncModelClient runs its own event loop on a background thread, so every
+Streamlit script thread shares one loop and one concurrency limit. Each
+call gets an overall deadline, jittered exponential-backoff retries for
+transient failures, and a circuit breaker that fails fast while the
+provider is down. Call latencies are collected in a histogram.
+
+Providers wrap a concrete backend (a Gemini-style model, Clarifai, or any
+HTTP endpoint speaking the StubModelServer protocol). ``client.as_model()``
+returns an object with the familiar ``generate_content(prompt, stream=...)``
+interface, so callers do not need to know about asyncio at all.
+"""
+import asyncio
+import json
+import queue
+import random
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class ModelClientError(Exception):
+    """Base class for errors raised by the client layer itself."""
+
+
+class ModelTimeoutError(ModelClientError):
+    pass
+
+
+class CircuitOpenError(ModelClientError):
+    pass
+
+
+# Exception class names (from google.api_core, grpc, requests, ...) worth retrying
+_RETRYABLE_NAMES = {
+    "ServiceUnavailable", "TooManyRequests", "ResourceExhausted", "DeadlineExceeded",
+    "InternalServerError", "RpcError", "ConnectionError", "Timeout", "ReadTimeout",
+}
+
+
+def is_retryable(error):
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    return any(cls.__name__ in _RETRYABLE_NAMES for cls in type(error).__mro__)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram in milliseconds."""
+
+    BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, float("inf"))
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = [0] * len(self.BUCKETS_MS)
+        self.total = 0
+        self.sum_ms = 0.0
+        self.errors = 0
+
+    def observe(self, seconds, ok=True):
+        ms = seconds * 1000
+        with self._lock:
+            self.counts[bisect_left(self.BUCKETS_MS, ms)] += 1
+            self.total += 1
+            self.sum_ms += ms
+            if not ok:
+                self.errors += 1
+
+    def percentile(self, q):
+        """Upper bound of the bucket containing the q-th percentile."""
+        with self._lock:
+            if not self.total:
+                return None
+            target = q / 100 * self.total
+            seen = 0
+            for bound, count in zip(self.BUCKETS_MS, self.counts):
+                seen += count
+                if seen >= target:
+                    return bound
+        return self.BUCKETS_MS[-1]
+
+    def stats(self):
+        return {
+            "calls": self.total,
+            "errors": self.errors,
+            "mean_ms": self.sum_ms / self.total if self.total else 0.0,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "buckets": {
+                ("+inf" if bound == float("inf") else f"<={bound}"): count
+                for bound, count in zip(self.BUCKETS_MS, self.counts)
+            },
+        }
+
+
+class CircuitBreaker:
+    """Opens after failure_threshold consecutive failures; lets one trial call through after reset_seconds."""
+
+    def __init__(self, failure_threshold=5, reset_seconds=30, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self.trips = 0
+        self._trial_in_flight = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if self._clock() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_in_flight or (self.opened_at is None and self.failures >= self.failure_threshold):
+                self.trips += 1
+                self.opened_at = self._clock()
+            self._trial_in_flight = False
+
+    def release_trial(self):
+        """Give up a trial call that ended without an outcome (e.g. cancelled), so another can run."""
+        with self._lock:
+            self._trial_in_flight = False
+
+
+class Provider:
+    """Async interface every backend implements."""
+    name = "provider"
+
+    async def generate(self, prompt):
+        raise NotImplementedError
+
+    async def stream(self, prompt):
+        # Providers without native streaming deliver the reply as one chunk
+        yield await self.generate(prompt)
+
+
+class ModelProvider(Provider):
+    """Anything with generate_content(prompt, stream=...), e.g. Gemini's GenerativeModel."""
+    name = "gemini"
+
+    def __init__(self, model, name=None):
+        self.model = model
+        if name:
+            self.name = name
+
+    @staticmethod
+    def _text(chunk):
+        try:
+            return chunk.text
+        except ValueError:
+            # Gemini raises when a chunk carries no text (e.g. safety blocked)
+            return ""
+
+    async def generate(self, prompt):
+        if hasattr(self.model, "generate_content_async"):
+            response = await self.model.generate_content_async(prompt)
+        else:
+            response = await asyncio.to_thread(self.model.generate_content, prompt)
+        return response.text
+
+    async def stream(self, prompt):
+        if hasattr(self.model, "generate_content_async"):
+            response = await self.model.generate_content_async(prompt, stream=True)
+            async for chunk in response:
+                yield self._text(chunk)
+            return
+
+        chunks = await asyncio.to_thread(self.model.generate_content, prompt, stream=True)
+        iterator = iter(chunks)
+        while True:
+            chunk = await asyncio.to_thread(next, iterator, None)
+            if chunk is None:
+                return
+            yield self._text(chunk)
+
+
+class ClarifaiProvider(Provider):
+    """Text completion through a model hosted on Clarifai (gRPC API)."""
+    name = "clarifai"
+
+    def __init__(self, pat, user_id, app_id, model_id, model_version_id=None):
+        self.pat = pat
+        self.user_id = user_id
+        self.app_id = app_id
+        self.model_id = model_id
+        self.model_version_id = model_version_id
+        self._stub = None
+
+    def _post(self, prompt):
+        from clarifai_grpc.channel.clarifai_channel import ClarifaiChannel
+        from clarifai_grpc.grpc.api import resources_pb2, service_pb2, service_pb2_grpc
+        from clarifai_grpc.grpc.api.status import status_code_pb2
+
+        if self._stub is None:
+            self._stub = service_pb2_grpc.V2Stub(ClarifaiChannel.get_grpc_channel())
+
+        request = service_pb2.PostModelOutputsRequest(
+            user_app_id=resources_pb2.UserAppIDSet(user_id=self.user_id, app_id=self.app_id),
+            model_id=self.model_id,
+            version_id=self.model_version_id or "",
+            inputs=[resources_pb2.Input(data=resources_pb2.Data(text=resources_pb2.Text(raw=prompt)))],
+        )
+        response = self._stub.PostModelOutputs(request, metadata=(("authorization", "Key " + self.pat),))
+        if response.status.code != status_code_pb2.SUCCESS:
+            raise RuntimeError(f"Clarifai request failed: {response.status.description}")
+        return response.outputs[0].data.text.raw
+
+    async def generate(self, prompt):
+        return await asyncio.to_thread(self._post, prompt)
+
+
+class HttpProvider(Provider):
+    """POSTs {"prompt": ...} to base_url/generate and reads {"text": ...} back."""
+    name = "http"
+
+    def __init__(self, base_url, request_timeout=60):
+        import requests
+
+        self.base_url = base_url.rstrip("/")
+        self.request_timeout = request_timeout
+        self._session = requests.Session()
+
+    def _post(self, prompt):
+        response = self._session.post(
+            f"{self.base_url}/generate", json={"prompt": prompt}, timeout=self.request_timeout
+        )
+        if response.status_code >= 500 or response.status_code == 429:
+            raise ConnectionError(f"Model endpoint returned {response.status_code}")
+        response.raise_for_status()
+        return response.json()["text"]
+
+    async def generate(self, prompt):
+        return await asyncio.to_thread(self._post, prompt)
+
+
+class _Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class _ClientModel:
+    """Adapter giving AsyncModelClient the generate_content() interface of a model."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def generate_content(self, prompt, stream=False):
+        if stream:
+            return (_Chunk(text) for text in self.client.stream(prompt))
+        return _Chunk(self.client.generate(prompt))
+
+
+class AsyncModelClient:
+    def __init__(self, provider, timeout=30, deadline=60, retries=2, backoff_base=0.5,
+                 backoff_max=8, max_concurrency=8, breaker=None):
+        self.provider = provider
+        self.timeout = timeout  # per attempt, and per chunk when streaming
+        self.deadline = deadline  # per call, across all attempts
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_concurrency = max_concurrency
+        self.breaker = breaker or CircuitBreaker()
+        self.histogram = LatencyHistogram()
+        self.retried = 0
+        self.rejected = 0
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="model-client", daemon=True)
+        self._thread.start()
+        self._semaphore = asyncio.run_coroutine_threadsafe(self._make_semaphore(), self._loop).result()
+
+    async def _make_semaphore(self):
+        return asyncio.Semaphore(self.max_concurrency)
+
+    def _check_breaker(self):
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise CircuitOpenError(f"{self.provider.name} is unavailable; not retrying for now")
+
+    def _record_error(self, error):
+        # Only outages count toward the breaker; a reply the provider refused
+        # (e.g. Gemini's ValueError for a safety-blocked chunk) says it is up
+        if is_retryable(error):
+            self.breaker.record_failure()
+        else:
+            self.breaker.release_trial()
+
+    def _backoff(self, attempt):
+        # Full jitter: anywhere between 0 and the exponential cap
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def _attempt(self, prompt):
+        async with self._semaphore:
+            return await self.provider.generate(prompt)
+
+    async def agenerate(self, prompt, deadline=None):
+        """Generate a full reply, retrying transient failures until the deadline."""
+        loop = asyncio.get_running_loop()
+        end = loop.time() + (deadline or self.deadline)
+        attempt = 0
+        while True:
+            self._check_breaker()
+            remaining = end - loop.time()
+            if remaining <= 0:
+                self.breaker.release_trial()
+                raise ModelTimeoutError(f"{self.provider.name} did not answer before the deadline")
+
+            started = time.perf_counter()
+            try:
+                text = await asyncio.wait_for(self._attempt(prompt), timeout=min(self.timeout, remaining))
+            except asyncio.CancelledError:
+                self.breaker.release_trial()
+                raise
+            except Exception as e:
+                self.histogram.observe(time.perf_counter() - started, ok=False)
+                self._record_error(e)
+                delay = self._backoff(attempt)
+                if attempt >= self.retries or not is_retryable(e) or loop.time() + delay >= end:
+                    if isinstance(e, asyncio.TimeoutError):
+                        raise ModelTimeoutError(f"{self.provider.name} timed out") from e
+                    raise
+                attempt += 1
+                self.retried += 1
+                await asyncio.sleep(delay)
+            else:
+                self.histogram.observe(time.perf_counter() - started)
+                self.breaker.record_success()
+                return text
+
+    async def _stream_into(self, prompt, chunks, deadline):
+        # Retries are only safe until the first chunk has been handed out
+        loop = asyncio.get_running_loop()
+        end = loop.time() + (deadline or self.deadline)
+        attempt = 0
+        while True:
+            try:
+                self._check_breaker()
+            except CircuitOpenError as e:
+                chunks.put(("error", e))
+                return
+            started = time.perf_counter()
+            sent_any = False
+            try:
+                async with self._semaphore:
+                    stream = self.provider.stream(prompt).__aiter__()
+                    while True:
+                        remaining = end - loop.time()
+                        if remaining <= 0:
+                            raise asyncio.TimeoutError()
+                        try:
+                            text = await asyncio.wait_for(stream.__anext__(), timeout=min(self.timeout, remaining))
+                        except StopAsyncIteration:
+                            break
+                        if text:
+                            sent_any = True
+                            chunks.put(("chunk", text))
+            except asyncio.CancelledError:
+                # The reader went away (e.g. a rerun); that says nothing about the provider
+                self.breaker.release_trial()
+                raise
+            except Exception as e:
+                self.histogram.observe(time.perf_counter() - started, ok=False)
+                self._record_error(e)
+                delay = self._backoff(attempt)
+                if sent_any or attempt >= self.retries or not is_retryable(e) or loop.time() + delay >= end:
+                    if isinstance(e, asyncio.TimeoutError):
+                        e = ModelTimeoutError(f"{self.provider.name} timed out")
+                    chunks.put(("error", e))
+                    return
+                attempt += 1
+                self.retried += 1
+                await asyncio.sleep(delay)
+            else:
+                self.histogram.observe(time.perf_counter() - started)
+                self.breaker.record_success()
+                chunks.put(("done", None))
+                return
+
+    def generate(self, prompt, deadline=None):
+        """Blocking wrapper around agenerate() for script threads."""
+        future = asyncio.run_coroutine_threadsafe(self.agenerate(prompt, deadline), self._loop)
+        return future.result()
+
+    def stream(self, prompt, deadline=None):
+        """Blocking iterator over reply chunks for script threads."""
+        chunks = queue.Queue()
+        future = asyncio.run_coroutine_threadsafe(self._stream_into(prompt, chunks, deadline), self._loop)
+        try:
+            while True:
+                kind, value = chunks.get()
+                if kind == "chunk":
+                    yield value
+                elif kind == "error":
+                    raise value
+                else:
+                    return
+        finally:
+            future.cancel()
+
+    def as_model(self):
+        return _ClientModel(self)
+
+    def close(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=1)
+
+    def stats(self):
+        return {
+            "provider": self.provider.name,
+            "circuit": self.breaker.state,
+            "circuit_trips": self.breaker.trips,
+            "retries": self.retried,
+            "rejected_by_circuit": self.rejected,
+            "max_concurrency": self.max_concurrency,
+            "latency": self.histogram.stats(),
+        }
+
+
+class StubModelServer:
+    """Local HTTP server standing in for a model provider.
+
+    Answers POST /generate with {"text": reply} after delay seconds; the
+    first fail_first requests get a 503 so retry paths can be exercised.
+    Use as a context manager and point HttpProvider at server.url.
+    """
+
+    def __init__(self, reply="This is a stub reply.", delay=0.0, fail_first=0, host="127.0.0.1", port=0):
+        self.reply = reply
+        self.delay = delay
+        self.fail_first = fail_first
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                json.loads(self.rfile.read(length) or b"{}")
+                stub.requests += 1
+                if stub.requests <= stub.fail_first:
+                    self.send_response(503)
+                    self.end_headers()
+                    return
+                time.sleep(stub.delay)
+                body = json.dumps({"text": stub.reply}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+if __name__ == "__main__":
+    # Serve the stub on a fixed port for manual runs: MODEL_BACKEND=http MODEL_HTTP_URL=http://127.0.0.1:8765
+    with StubModelServer(port=8765) as server:
+        print(f"Stub model server listening on {server.url}")
+        threading.Event().wait()
@@ -0,0 +1,134 @@
+"""Append-only, column-oriented mood history.
+
+Timestamps and scores live in NumPy arrays that grow by doubling, so adding
+a sample is amortized O(1) and reading a column is a zero-copy view. A
+running cumulative sum, per-day buckets and the current streak are updated
+on append, so the page never rebuilds a DataFrame from a list of dicts, and
+the chart is only rebuilt when the data version changes.
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+
+
+class MoodStore:
+    def __init__(self, capacity=64):
+        self._times = np.empty(capacity, dtype="datetime64[us]")
+        self._scores = np.empty(capacity, dtype=np.int8)
+        self._cumsum = np.zeros(capacity + 1, dtype=np.float64)  # _cumsum[i] = sum of first i scores
+        self.notes = []
+        self._size = 0
+        self.version = 0
+
+        self.daily = {}  # date -> [score sum, count]
+        self.streak = 0
+        self.longest_streak = 0
+        self._last_day = None
+
+        self._figure = None
+        self._figure_version = -1
+
+    def __len__(self):
+        return self._size
+
+    def _grow(self):
+        capacity = len(self._times) * 2
+        self._times = np.resize(self._times, capacity)
+        self._scores = np.resize(self._scores, capacity)
+        cumsum = np.zeros(capacity + 1, dtype=np.float64)
+        cumsum[:self._size + 1] = self._cumsum[:self._size + 1]
+        self._cumsum = cumsum
+
+    def append(self, date, mood, notes=""):
+        if self._size == len(self._times):
+            self._grow()
+        i = self._size
+        self._times[i] = np.datetime64(date, "us")
+        self._scores[i] = mood
+        self._cumsum[i + 1] = self._cumsum[i] + mood
+        self.notes.append(notes)
+        self._size += 1
+        self.version += 1
+
+        day = date.date()
+        bucket = self.daily.setdefault(day, [0, 0])
+        bucket[0] += mood
+        bucket[1] += 1
+
+        if self._last_day is None or day > self._last_day:
+            if self._last_day is not None and day - self._last_day == timedelta(days=1):
+                self.streak += 1
+            else:
+                self.streak = 1
+            self._last_day = day
+            self.longest_streak = max(self.longest_streak, self.streak)
+
+    @property
+    def timestamps(self):
+        return self._times[:self._size]
+
+    @property
+    def scores(self):
+        return self._scores[:self._size]
+
+    def mean(self, last=None):
+        """Mean score overall, or over the last `last` samples, in O(1)."""
+        if not self._size:
+            return None
+        n = self._size if last is None else min(last, self._size)
+        return (self._cumsum[self._size] - self._cumsum[self._size - n]) / n
+
+    def rolling_mean(self, window=7):
+        """Trailing mean at every sample (shorter windows at the start)."""
+        c = self._cumsum[:self._size + 1]
+        ends = np.arange(1, self._size + 1)
+        starts = np.maximum(ends - window, 0)
+        return (c[ends] - c[starts]) / (ends - starts)
+
+    def daily_means(self):
+        return {day: total / count for day, (total, count) in sorted(self.daily.items())}
+
+    def current_streak(self, today=None):
+        """Consecutive days with an entry, ending today or yesterday."""
+        today = today or datetime.now().date()
+        if self._last_day is None or today - self._last_day > timedelta(days=1):
+            return 0
+        return self.streak
+
+    def entry(self, i):
+        return {
+            'date': self._times[i].astype(datetime),
+            'mood': int(self._scores[i]),
+            'notes': self.notes[i],
+        }
+
+    def page(self, cursor, limit):
+        """Newest-first page of entries for paginated_list."""
+        end = self._size if cursor is None else cursor
+        start = max(0, end - limit)
+        return [self.entry(i) for i in range(end - 1, start - 1, -1)], (start if start > 0 else None)
+
+    def figure(self, build):
+        """Return build(self), rebuilding only when entries were added since the last call."""
+        if self._figure_version != self.version:
+            self._figure = build(self)
+            self._figure_version = self.version
+        return self._figure
+
+    def to_records(self):
+        """JSON-safe list of entries, oldest first."""
+        return [
+            {'date': str(self._times[i]), 'mood': int(self._scores[i]), 'notes': self.notes[i]}
+            for i in range(self._size)
+        ]
+
+    @classmethod
+    def from_records(cls, records):
+        """Rebuild a store from to_records() output (or the old list of entry dicts)."""
+        store = cls(capacity=max(64, len(records)))
+        for record in records:
+            moment = record['date']
+            if isinstance(moment, str):
+                moment = datetime.fromisoformat(moment)
+            store.append(moment, record['mood'], record.get('notes', ""))
+        return store
@@ -0,0 +1,41 @@
+"""Registry of top-level pages that renders only the selected one.
+
+st.tabs executes every tab body on each rerun; routing through a registry
+means a rerun only pays for the page the user is looking at. Data the pages
+keep in st.session_state is untouched by switching pages. Render times are
+handed to an on_render callback (the app feeds them to its profiler).
+"""
+import time
+from collections import OrderedDict
+
+
+class PageRouter:
+    def __init__(self, clock=time.perf_counter, on_render=None):
+        self._pages = OrderedDict()
+        # Optional callback(name, seconds) after every render, e.g. to feed a profiler
+        self.on_render = on_render
+        self._clock = clock
+
+    def register(self, name, render):
+        self._pages[name] = render
+
+    def page(self, name):
+        """Decorator form of register()."""
+        def decorator(render):
+            self.register(name, render)
+            return render
+        return decorator
+
+    def names(self):
+        return list(self._pages)
+
+    def render(self, name):
+        """Run the named page and return how long it took in seconds."""
+        started = self._clock()
+        try:
+            self._pages[name]()
+        finally:
+            elapsed = self._clock() - started
+            if self.on_render is not None:
+                self.on_render(name, elapsed)
+        return elapsed
@@ -0,0 +1,55 @@
+"""Cursor-paged list rendering for long histories.
+
+Only one page of items is fetched and rendered per rerun, so the number of
+frontend elements stays fixed however long the history grows. Pages come
+from a fetch_page(cursor, limit) -> (items, next_cursor) callable, which
+lets each store page in whatever way is cheap for it.
+"""
+import streamlit as st
+
+
+def list_page_fetcher(items):
+    """fetch_page over an in-memory list, newest (last) item first."""
+    def fetch_page(cursor, limit):
+        end = len(items) if cursor is None else cursor
+        start = max(0, end - limit)
+        return items[start:end][::-1], (start if start > 0 else None)
+    return fetch_page
+
+
+def paginated_list(key, fetch_page, render_item, page_size=10, reset_on=None):
+    """Render one page of items with Newer/Older controls.
+
+    The cursor trail is kept in st.session_state under key; it starts over
+    at the first page whenever reset_on (e.g. the search term) changes.
+    Returns the number of items shown.
+    """
+    trail_key = f"{key}_cursors"
+    signature_key = f"{key}_signature"
+    if st.session_state.get(signature_key) != reset_on or trail_key not in st.session_state:
+        st.session_state[trail_key] = [None]
+        st.session_state[signature_key] = reset_on
+
+    trail = st.session_state[trail_key]
+    items, next_cursor = fetch_page(trail[-1], page_size)
+    if not items and len(trail) > 1:
+        # The page we were on disappeared (e.g. entries were cleared); start over
+        trail[:] = [None]
+        items, next_cursor = fetch_page(None, page_size)
+
+    for item in items:
+        render_item(item)
+
+    if len(trail) > 1 or next_cursor is not None:
+        newer_col, page_col, older_col = st.columns([1, 1, 1])
+        with newer_col:
+            if len(trail) > 1 and st.button("← Newer", key=f"{key}_newer", use_container_width=True):
+                trail.pop()
+                st.rerun()
+        with page_col:
+            st.caption(f"Page {len(trail)}")
+        with older_col:
+            if next_cursor is not None and st.button("Older →", key=f"{key}_older", use_container_width=True):
+                trail.append(next_cursor)
+                st.rerun()
+    return len(items)
@@ -0,0 +1,196 @@
+"""Lightweight timing and sampled profiling for reruns, pages and external calls.
+
+timed(name) works as a context manager or a decorator and records
+perf_counter_ns durations into a rolling window per name, from which exact
+p50/p95/p99 are computed. Names are grouped by prefix: "rerun", "page:...",
+"call:..." (model, speech, network), "build:..." (figures) and "latency:..."
+(user-facing waits such as time to first token). This is the one place the
+app keeps timing windows; other modules report into it.
+
+cProfile is far too heavy to leave on, so profile_rerun() only profiles one
+rerun in every sample_every (0 turns it off) and merges the results, which
+can be exported in pstats format for snakeviz or ``python -m pstats``.
+"""
+import cProfile
+import io
+import json
+import marshal
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class TimingSeries:
+    __slots__ = ("samples", "calls", "errors", "total_ns")
+
+    def __init__(self, window):
+        self.samples = deque(maxlen=window)
+        self.calls = 0
+        self.errors = 0
+        self.total_ns = 0
+
+    def summary(self):
+        ordered = sorted(self.samples)
+        n = len(ordered)
+
+        def percentile(q):
+            return ordered[min(n - 1, int(q / 100 * n))] / 1e6
+
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "mean_ms": self.total_ns / self.calls / 1e6,
+            "p50_ms": percentile(50),
+            "p95_ms": percentile(95),
+            "p99_ms": percentile(99),
+            "max_ms": ordered[-1] / 1e6,
+        }
+
+
+class Profiler:
+    def __init__(self, window=500, sample_every=0):
+        self.window = window
+        self.sample_every = sample_every
+        self._series = {}
+        self._lock = threading.Lock()
+        self._reruns = 0
+        self._profile_lock = threading.Lock()
+        self._profile_stats = None
+        self._profiled_reruns = 0
+        self._configured = False
+
+    def configure(self, sample_every):
+        """Apply the configured sampling rate once per process.
+
+        Later calls are ignored, so a rate changed at runtime (the Admin
+        page sets sample_every directly) is not overwritten by the next rerun.
+        """
+        with self._lock:
+            if not self._configured:
+                self.sample_every = sample_every
+                self._configured = True
+
+    def observe(self, name, duration_ns, ok=True):
+        with self._lock:
+            series = self._series.get(name)
+            if series is None:
+                series = self._series[name] = TimingSeries(self.window)
+            series.samples.append(duration_ns)
+            series.calls += 1
+            series.total_ns += duration_ns
+            if not ok:
+                series.errors += 1
+
+    def observe_seconds(self, name, seconds, ok=True):
+        self.observe(name, int(seconds * 1e9), ok)
+
+    @contextmanager
+    def timed(self, name):
+        """Time the block (or, as a decorator, each call) under name."""
+        started = time.perf_counter_ns()
+        ok = True
+        try:
+            yield
+        except Exception:
+            # Streamlit's rerun/stop signals are BaseExceptions and do not count as errors
+            ok = False
+            raise
+        finally:
+            self.observe(name, time.perf_counter_ns() - started, ok)
+
+    @contextmanager
+    def profile_rerun(self):
+        """Time a whole rerun, running it under cProfile if this one is sampled."""
+        with self._lock:
+            self._reruns += 1
+            sampled = self.sample_every > 0 and self._reruns % self.sample_every == 0
+        # Only one profiler can be active per process; skip sampling if another rerun has it
+        if sampled and self._profile_lock.acquire(blocking=False):
+            profile = cProfile.Profile()
+            try:
+                with self.timed("rerun"):
+                    profile.enable()
+                    try:
+                        yield
+                    finally:
+                        profile.disable()
+                self._merge(profile)
+            finally:
+                self._profile_lock.release()
+        else:
+            with self.timed("rerun"):
+                yield
+
+    def _merge(self, profile):
+        with self._lock:
+            if self._profile_stats is None:
+                self._profile_stats = pstats.Stats(profile, stream=io.StringIO())
+            else:
+                self._profile_stats.add(profile)
+            self._profiled_reruns += 1
+
+    def stats(self, prefix=None):
+        """{name: summary} for every series, or those starting with prefix."""
+        with self._lock:
+            return {
+                name: series.summary()
+                for name, series in sorted(self._series.items())
+                if series.calls and (prefix is None or name.startswith(prefix))
+            }
+
+    def top_functions(self, limit=25):
+        """Functions with the most cumulative time across the sampled reruns."""
+        with self._lock:
+            if self._profile_stats is None:
+                return []
+            entries = list(self._profile_stats.stats.items())
+        entries.sort(key=lambda item: item[1][3], reverse=True)
+        return [
+            {
+                "function": f"{path}:{line}({name})",
+                "calls": calls,
+                "own_ms": 1000 * own,
+                "cumulative_ms": 1000 * cumulative,
+            }
+            for (path, line, name), (_, calls, own, cumulative, _) in entries[:limit]
+        ]
+
+    def export_json(self):
+        """Summaries plus the raw windowed samples (in ns), for offline analysis."""
+        with self._lock:
+            series = {
+                name: {**s.summary(), "samples_ns": list(s.samples)}
+                for name, s in sorted(self._series.items()) if s.calls
+            }
+            profiled = self._profiled_reruns
+        return json.dumps({
+            "exported_at": time.time(),
+            "reruns": self._reruns,
+            "profiled_reruns": profiled,
+            "series": series,
+            "top_functions": self.top_functions(),
+        }, indent=1)
+
+    def export_pstats(self):
+        """Merged cProfile data in the pstats file format, or None before any sampled rerun."""
+        with self._lock:
+            if self._profile_stats is None:
+                return None
+            return marshal.dumps(self._profile_stats.stats)
+
+    def reset(self):
+        with self._lock:
+            self._series = {}
+            self._reruns = 0
+            self._profile_stats = None
+            self._profiled_reruns = 0
+
+
+# Module-level so methods can be decorated at import time; lives as long as the process
+default_profiler = Profiler()
+
+
+def timed(name):
+    return default_profiler.timed(name)
@@ -0,0 +1,68 @@
+"""Process-wide registry for expensive clients.
+
+Heavy objects (the generative model, the TTS engine) are built once per
+process the first time they are requested and then shared by every session.
+Construction is guarded by a per-name lock so concurrent first requests only
+build a resource once.
+"""
+import threading
+import time
+
+
+class ResourceRegistry:
+    def __init__(self, clock=time.perf_counter):
+        self._clock = clock
+        self._resources = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _lock_for(self, name):
+        with self._lock:
+            return self._locks.setdefault(name, threading.Lock())
+
+    def get(self, name, factory):
+        """Return the shared resource called name, building it with factory() if needed.
+
+        Exceptions from factory() propagate and nothing is cached, so a later
+        call can retry.
+        """
+        if name in self._resources:
+            return self._resources[name]
+
+        with self._lock_for(name):
+            if name in self._resources:
+                return self._resources[name]
+
+            started = self._clock()
+            resource = factory()
+            elapsed = self._clock() - started
+
+            stats = self._stats.setdefault(name, {"constructions": 0, "total_seconds": 0.0})
+            stats["constructions"] += 1
+            stats["total_seconds"] += elapsed
+            stats["last_seconds"] = elapsed
+            stats["built_at"] = time.time()
+
+            self._resources[name] = resource
+            return resource
+
+    def record_handle(self, name):
+        """Count a lightweight per-session handle created on top of the shared resources."""
+        with self._lock:
+            stats = self._stats.setdefault(name, {"constructions": 0, "total_seconds": 0.0})
+            stats["constructions"] += 1
+
+    def discard(self, name):
+        """Drop a resource so the next get() rebuilds it."""
+        with self._lock_for(name):
+            self._resources.pop(name, None)
+
+    def objects(self):
+        """The shared resources built so far."""
+        with self._lock:
+            return list(self._resources.values())
+
+    def stats(self):
+        with self._lock:
+            return {name: dict(values) for name, values in self._stats.items()}
@@ -0,0 +1,109 @@
+"""Bounded LRU cache for assistant replies.
+
+Entries are keyed on a normalized version of the user message and, when
+per-session scoping is enabled, on the Streamlit session id as well so one
+user's reply is never served to another.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_prompt(text):
+    """Collapse whitespace and case so trivially different prompts share a key."""
+    return re.sub(r"\s+", " ", text or "").strip().lower()
+
+
+class ResponseCache:
+    def __init__(self, max_entries=256, ttl_seconds=3600, per_session=True, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.per_session = per_session
+        self._clock = clock
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _key(self, prompt, session_id=None):
+        scope = session_id if self.per_session else None
+        return (scope, normalize_prompt(prompt))
+
+    def get(self, prompt, session_id=None):
+        """Return the cached reply or None, refreshing its LRU position on a hit."""
+        key = self._key(prompt, session_id)
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = item
+            if expires_at is not None and expires_at <= self._clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, prompt, value, session_id=None):
+        key = self._key(prompt, session_id)
+        expires_at = self._clock() + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, prompt, compute, session_id=None):
+        """Return a cached reply, or call compute() and cache what it returns.
+
+        compute() is expected to raise on failure so error replies never end
+        up in the cache.
+        """
+        value = self.get(prompt, session_id)
+        if value is None:
+            value = compute()
+            self.put(prompt, value, session_id)
+        return value
+
+    def purge_expired(self):
+        now = self._clock()
+        with self._lock:
+            expired = [k for k, (exp, _) in self._entries.items() if exp is not None and exp <= now]
+            for key in expired:
+                del self._entries[key]
+            self.expirations += len(expired)
+        return len(expired)
+
+    def clear_session(self, session_id):
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == session_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,190 @@
+"""Running sleep statistics and downsampled chart series.
+
+Every aggregate the tracker shows is kept as running sums that a new log
+updates in O(1) (plus one step per factor ticked): mean duration, the most
+common quality, how each factor correlates with duration and quality, and
+per-week rollups. Nights are also kept in NumPy columns so long histories
+can be bucketed down to a fixed number of chart points.
+"""
+import math
+from collections import Counter
+from datetime import date, timedelta
+
+import numpy as np
+
+QUALITY_LEVELS = ["Poor", "Fair", "Good", "Very Good", "Excellent"]
+_QUALITY_SCORE = {quality: score for score, quality in enumerate(QUALITY_LEVELS, start=1)}
+
+
+def downsample(x, y, max_points):
+    """Average y over equal-sized runs of points so at most max_points remain.
+
+    Each bucket is labelled with its first x, so bars still line up with dates.
+    """
+    n = len(y)
+    if n <= max_points:
+        return x, y
+    starts = np.linspace(0, n, max_points, endpoint=False).astype(np.int64)
+    sums = np.add.reduceat(y, starts)
+    sizes = np.diff(np.append(starts, n))
+    return x[starts], sums / sizes
+
+
+class _Sums:
+    """Count, sum and sum of squares for one variable."""
+    __slots__ = ("n", "total", "squares")
+
+    def __init__(self):
+        self.n = 0
+        self.total = 0.0
+        self.squares = 0.0
+
+    def add(self, value):
+        self.n += 1
+        self.total += value
+        self.squares += value * value
+
+    @property
+    def mean(self):
+        return self.total / self.n if self.n else None
+
+    @property
+    def variance(self):
+        if not self.n:
+            return 0.0
+        return max(0.0, self.squares / self.n - (self.total / self.n) ** 2)
+
+
+class SleepStats:
+    def __init__(self, capacity=64):
+        self._dates = np.empty(capacity, dtype="datetime64[D]")
+        self._durations = np.empty(capacity, dtype=np.float64)
+        self.qualities = []
+        self.factors = []
+        self._size = 0
+        self.version = 0
+
+        self.duration = _Sums()
+        self.quality = _Sums()
+        self.quality_counts = Counter()
+        self.mode_quality = None
+        # factor -> [nights with it, duration sum, quality score sum]
+        self.factor_sums = {}
+        # Monday of the week -> [nights, duration sum, quality score sum]
+        self.weekly = {}
+
+        self._figure = None
+        self._figure_version = -1
+
+    def __len__(self):
+        return self._size
+
+    def _grow(self):
+        capacity = len(self._dates) * 2
+        self._dates = np.resize(self._dates, capacity)
+        self._durations = np.resize(self._durations, capacity)
+
+    def add(self, night, duration, quality, factors=()):
+        if self._size == len(self._dates):
+            self._grow()
+        self._dates[self._size] = np.datetime64(night, "D")
+        self._durations[self._size] = duration
+        self.qualities.append(quality)
+        self.factors.append(list(factors))
+        self._size += 1
+        self.version += 1
+
+        score = _QUALITY_SCORE[quality]
+        self.duration.add(duration)
+        self.quality.add(score)
+
+        self.quality_counts[quality] += 1
+        if self.mode_quality is None or self.quality_counts[quality] > self.quality_counts[self.mode_quality]:
+            self.mode_quality = quality
+
+        for factor in factors:
+            sums = self.factor_sums.setdefault(factor, [0, 0.0, 0.0])
+            sums[0] += 1
+            sums[1] += duration
+            sums[2] += score
+
+        week = night - timedelta(days=night.weekday())
+        rollup = self.weekly.setdefault(week, [0, 0.0, 0.0])
+        rollup[0] += 1
+        rollup[1] += duration
+        rollup[2] += score
+
+    @property
+    def mean_duration(self):
+        return self.duration.mean
+
+    def factor_correlations(self, target="duration"):
+        """Correlation between ticking each factor and the target ("duration" or "quality").
+
+        This is the point-biserial correlation, computed from the running sums.
+        Factors ticked on every night, or none, have no defined correlation and
+        are left out.
+        """
+        overall = self.duration if target == "duration" else self.quality
+        column = 1 if target == "duration" else 2
+        std = math.sqrt(overall.variance)
+        n = overall.n
+        correlations = {}
+        for factor, sums in self.factor_sums.items():
+            with_factor = sums[0]
+            without = n - with_factor
+            if not with_factor or not without or not std:
+                continue
+            mean_with = sums[column] / with_factor
+            mean_without = (overall.total - sums[column]) / without
+            correlations[factor] = (mean_with - mean_without) / std * math.sqrt(with_factor * without) / n
+        return correlations
+
+    def week_mean_duration(self, day):
+        """Mean duration logged in the Monday-to-Sunday week containing day, or None if it has no nights."""
+        rollup = self.weekly.get(day - timedelta(days=day.weekday()))
+        return rollup[1] / rollup[0] if rollup else None
+
+    def weekly_rollups(self):
+        """[(week start, nights, mean duration, mean quality score)] oldest first."""
+        return [(week, nights, duration / nights, score / nights)
+                for week, (nights, duration, score) in sorted(self.weekly.items())]
+
+    def chart_series(self, max_points=400):
+        """(dates, durations, nights per point), ordered by date and downsampled to max_points."""
+        order = np.argsort(self._dates[:self._size], kind="stable")
+        dates = self._dates[:self._size][order]
+        durations = self._durations[:self._size][order]
+        bucket = max(1, math.ceil(self._size / max_points))
+        dates, durations = downsample(dates, durations, max_points)
+        return dates, durations, bucket
+
+    def figure(self, build):
+        """Return build(self), rebuilding only when nights were logged since the last call."""
+        if self._figure_version != self.version:
+            self._figure = build(self)
+            self._figure_version = self.version
+        return self._figure
+
+    def to_records(self):
+        """JSON-safe list of nights in the order they were logged."""
+        return [
+            {
+                'date': str(self._dates[i]),
+                'duration': float(self._durations[i]),
+                'quality': self.qualities[i],
+                'factors': self.factors[i],
+            }
+            for i in range(self._size)
+        ]
+
+    @classmethod
+    def from_records(cls, records):
+        """Rebuild the statistics from to_records() output (or the old list of log dicts)."""
+        stats = cls(capacity=max(64, len(records)))
+        for record in records:
+            night = record['date']
+            if isinstance(night, str):
+                night = date.fromisoformat(night)
+            stats.add(night, record['duration'], record['quality'], record.get('factors', ()))
+        return stats
@@ -0,0 +1,225 @@
+"""Procedural ambient soundscapes synthesized block by block with NumPy.
+
+Textures are built from coloured noise made by shaping the spectrum of
+white noise in the FFT domain and overlap-adding windowed blocks, so the
+output is seamless however long it runs and never repeats. Rain adds
+randomly timed droplets; the ocean rides a slow, irregular swell. Volume
+changes are ramped across a block and switching texture crossfades at
+equal power, so neither clicks.
+
+Run ``python soundscape.py --bench`` to measure generation speed, or
+``python soundscape.py rain rain.wav`` to write a 30 second sample.
+"""
+import io
+import struct
+import sys
+import time
+
+import numpy as np
+
+TEXTURES = ("rain", "ocean", "white", "pink", "brown")
+
+
+class ColoredNoise:
+    """Endless noise with a 1/f**exponent power spectrum (0 white, 1 pink, 2 brown)."""
+
+    def __init__(self, exponent, block_size, sample_rate, rng):
+        self.block_size = block_size
+        self.rng = rng
+        n = 2 * block_size
+        freqs = np.fft.rfftfreq(n, 1 / sample_rate)
+        # Roll off below 20 Hz instead of letting brown noise blow up at DC
+        shape = np.maximum(freqs, 20.0) ** (-exponent / 2)
+        self._shape = shape / np.sqrt(np.mean(shape ** 2))
+        # sqrt-Hann windows at 50% overlap keep the output variance constant
+        self._window = np.sqrt(0.5 - 0.5 * np.cos(2 * np.pi * np.arange(n) / n))
+        self._tail = np.zeros(block_size)
+
+    def next(self):
+        n = 2 * self.block_size
+        spectrum = np.fft.rfft(self.rng.standard_normal(n)) * self._shape
+        frame = np.fft.irfft(spectrum, n) * self._window
+        out = self._tail + frame[:self.block_size]
+        self._tail = frame[self.block_size:]
+        return out
+
+
+class _Rain:
+    def __init__(self, block_size, sample_rate, rng):
+        self.rng = rng
+        self.sample_rate = sample_rate
+        self.bed = ColoredNoise(0.6, block_size, sample_rate, rng)
+        # A droplet is a few milliseconds of bright, quickly decaying noise
+        length = int(0.012 * sample_rate)
+        kernel = rng.standard_normal(length) * np.exp(-np.arange(length) / (0.002 * sample_rate))
+        kernel = np.diff(kernel, prepend=0.0)
+        self.kernel = kernel / np.abs(kernel).max()
+        self._carry = np.zeros(length - 1)
+        self.drops_per_second = 180
+
+    def next(self):
+        bed = self.bed.next()
+        n = len(bed)
+        hits = self.rng.random(n) < self.drops_per_second / self.sample_rate
+        impulses = np.where(hits, self.rng.uniform(0.2, 1.0, n) ** 3, 0.0)
+        drops = np.convolve(impulses, self.kernel)
+        drops[:len(self._carry)] += self._carry
+        self._carry = drops[n:]
+        return 0.12 * bed + 0.3 * drops[:n]
+
+
+class _Ocean:
+    def __init__(self, block_size, sample_rate, rng):
+        self.rng = rng
+        self.sample_rate = sample_rate
+        self.deep = ColoredNoise(2.0, block_size, sample_rate, rng)
+        self.wash = ColoredNoise(1.0, block_size, sample_rate, rng)
+        self._phase = rng.random()
+        self._period = self._new_period()
+
+    def _new_period(self):
+        return self.rng.uniform(7.0, 12.0) * self.sample_rate
+
+    def _swell(self, n):
+        # Each wave gets its own length; a block is far shorter than a wave,
+        # so at most one new wave starts per block
+        phase = self._phase + np.arange(1, n + 1) / self._period
+        wrapped = phase >= 1.0
+        if wrapped.any():
+            first = np.argmax(wrapped)
+            self._period = self._new_period()
+            phase[first:] = np.arange(1, n - first + 1) / self._period
+        self._phase = phase[-1]
+        return 0.15 + 0.85 * (0.5 - 0.5 * np.cos(2 * np.pi * phase)) ** 2
+
+    def next(self):
+        swell = self._swell(self.deep.block_size)
+        return swell * (0.25 * self.deep.next() + 0.1 * self.wash.next())
+
+
+class _Noise:
+    # (spectral exponent, gain) tuned so every texture plays at a similar loudness
+    COLORS = {"white": (0.0, 0.08), "pink": (1.0, 0.12), "brown": (2.0, 0.2)}
+
+    def __init__(self, color, block_size, sample_rate, rng):
+        exponent, self.gain = self.COLORS[color]
+        self.noise = ColoredNoise(exponent, block_size, sample_rate, rng)
+
+    def next(self):
+        return self.gain * self.noise.next()
+
+
+def _texture(name, block_size, sample_rate, rng):
+    if name == "rain":
+        return _Rain(block_size, sample_rate, rng)
+    if name == "ocean":
+        return _Ocean(block_size, sample_rate, rng)
+    return _Noise(name, block_size, sample_rate, rng)
+
+
+def wav_header(sample_rate, n_samples=None):
+    """16-bit mono WAV header; without n_samples the sizes are set to the maximum for streaming."""
+    data_size = 0xFFFFFFFF - 36 if n_samples is None else 2 * n_samples
+    return (b"RIFF" + struct.pack("<I", 36 + data_size) + b"WAVE"
+            + b"fmt " + struct.pack("<IHHIIHH", 16, 1, 1, sample_rate, 2 * sample_rate, 2, 16)
+            + b"data" + struct.pack("<I", data_size))
+
+
+class Soundscape:
+    def __init__(self, texture="rain", volume=0.5, sample_rate=22050, block_size=2048, seed=None):
+        if texture not in TEXTURES:
+            raise ValueError(f"unknown texture {texture!r}; choose from {', '.join(TEXTURES)}")
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self.rng = np.random.default_rng(seed)
+        self.texture = texture
+        self._source = _texture(texture, block_size, sample_rate, self.rng)
+        self._next_source = None
+        self._position = 0
+        self._fade_start = 0
+        self._fade_len = 0
+        self.volume = volume
+        self._applied_volume = volume
+
+    def set_volume(self, volume):
+        """Change the volume; the change is ramped over the next block."""
+        self.volume = min(max(volume, 0.0), 1.0)
+
+    def crossfade_to(self, texture, seconds=4.0, after=0.0):
+        """Blend into another texture over the given number of seconds, starting after `after` seconds."""
+        self._next_source = _texture(texture, self.block_size, self.sample_rate, self.rng)
+        self.texture = texture
+        self._fade_start = self._position + int(after * self.sample_rate)
+        self._fade_len = max(1, int(seconds * self.sample_rate))
+
+    def next_block(self):
+        """The next block_size float samples in [-1, 1]."""
+        block = self._source.next()
+        if self._next_source is not None and self._position + len(block) > self._fade_start:
+            incoming = self._next_source.next()
+            index = self._position + np.arange(len(block)) - self._fade_start
+            progress = np.clip(index / self._fade_len, 0.0, 1.0)
+            block = np.cos(0.5 * np.pi * progress) * block + np.sin(0.5 * np.pi * progress) * incoming
+            if progress[-1] >= 1.0:
+                self._source, self._next_source = self._next_source, None
+        self._position += len(block)
+
+        gain = np.linspace(self._applied_volume, self.volume, len(block), endpoint=False)
+        self._applied_volume = self.volume
+        return np.clip(block * gain, -1.0, 1.0)
+
+    def blocks(self, seconds=None):
+        """Yield float blocks for the given duration, or forever."""
+        remaining = None if seconds is None else int(seconds * self.sample_rate)
+        while remaining is None or remaining > 0:
+            block = self.next_block()
+            if remaining is not None:
+                block = block[:remaining]
+                remaining -= len(block)
+            yield block
+
+    def chunks(self, seconds=None, fade_seconds=1.5):
+        """Yield a 16-bit WAV stream: the header, then one PCM chunk per block.
+
+        With a duration, the first and last fade_seconds fade in and out.
+        """
+        n_samples = None if seconds is None else int(seconds * self.sample_rate)
+        yield wav_header(self.sample_rate, n_samples)
+        fade = int(fade_seconds * self.sample_rate)
+        position = 0
+        for block in self.blocks(seconds):
+            if fade:
+                index = position + np.arange(len(block))
+                envelope = np.minimum(index / fade, 1.0)
+                if n_samples is not None:
+                    envelope = np.minimum(envelope, (n_samples - index) / fade)
+                block = block * envelope
+            position += len(block)
+            yield (block * 32767).astype("<i2").tobytes()
+
+    def clip(self, seconds, fade_seconds=1.5):
+        """A finished WAV clip of the given length."""
+        output = io.BytesIO()
+        for chunk in self.chunks(seconds, fade_seconds):
+            output.write(chunk)
+        return output.getvalue()
+
+
+def _benchmark(seconds=60.0):
+    for texture in TEXTURES:
+        soundscape = Soundscape(texture, seed=0)
+        started = time.perf_counter()
+        total = sum(len(chunk) for chunk in soundscape.chunks(seconds))
+        elapsed = time.perf_counter() - started
+        print(f"{texture}: {seconds:.0f}s of audio in {elapsed * 1000:.1f} ms "
+              f"({seconds / elapsed:.0f}x real time, {total / 1024:.0f} KiB)")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--bench"]:
+        _benchmark()
+    elif len(sys.argv) == 3:
+        with open(sys.argv[2], "wb") as f:
+            f.write(Soundscape(sys.argv[1]).clip(30))
+    else:
+        print("usage: python soundscape.py --bench | <texture> <output.wav>")
@@ -0,0 +1,174 @@
+"""Interchangeable speech-recognition backends.
+
+Every backend turns ``speech_recognition.AudioData`` into text and keeps
+track of how much audio it processed and how long that took, so each can
+report its real-time factor (processing time / audio duration; below 1.0 is
+faster than real time). Backends that need local models import their
+dependencies lazily, so only the selected one has to be installed.
+
+Select one with ``create_backend(name, ...)``: "google" (network),
+"sphinx" (pocketsphinx), "whisper" (openai-whisper) or "vosk".
+"""
+import json
+import threading
+import time
+
+import speech_recognition as sr
+
+
+class SpeechBackend:
+    name = "base"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.audio_seconds = 0.0
+        self.processing_seconds = 0.0
+
+    def recognize(self, audio):
+        """Return the transcript of audio, raising sr.UnknownValueError when there is none."""
+        raise NotImplementedError
+
+    def _observe(self, audio_seconds, processing_seconds):
+        with self._lock:
+            self.calls += 1
+            self.audio_seconds += audio_seconds
+            self.processing_seconds += processing_seconds
+
+    def transcribe(self, audio):
+        """Batch recognition of a whole AudioData clip, with timing."""
+        started = time.perf_counter()
+        try:
+            return self.recognize(audio)
+        finally:
+            duration = len(audio.frame_data) / (audio.sample_rate * audio.sample_width)
+            self._observe(duration, time.perf_counter() - started)
+
+    def transcribe_chunks(self, chunks, sample_rate, sample_width=2):
+        """Recognize a sequence of raw PCM chunks, yielding text as it becomes available.
+
+        The default treats each chunk (e.g. one VAD speech segment) as its
+        own utterance; streaming engines override this to decode
+        incrementally.
+        """
+        for chunk in chunks:
+            try:
+                text = self.transcribe(sr.AudioData(chunk, sample_rate, sample_width))
+            except sr.UnknownValueError:
+                continue
+            if text:
+                yield text
+
+    @property
+    def real_time_factor(self):
+        if not self.audio_seconds:
+            return None
+        return self.processing_seconds / self.audio_seconds
+
+    def stats(self):
+        return {
+            "backend": self.name,
+            "calls": self.calls,
+            "audio_seconds": self.audio_seconds,
+            "processing_seconds": self.processing_seconds,
+            "real_time_factor": self.real_time_factor,
+        }
+
+
+class GoogleBackend(SpeechBackend):
+    """Google Web Speech API via speech_recognition (needs network access)."""
+    name = "google"
+
+    def __init__(self, language="en-US"):
+        super().__init__()
+        self.language = language
+        self.recognizer = sr.Recognizer()
+
+    def recognize(self, audio):
+        return self.recognizer.recognize_google(audio, language=self.language)
+
+
+class SphinxBackend(SpeechBackend):
+    """CMU Sphinx, fully offline (requires pocketsphinx)."""
+    name = "sphinx"
+
+    def __init__(self, language="en-US"):
+        super().__init__()
+        self.language = language
+        self.recognizer = sr.Recognizer()
+
+    def recognize(self, audio):
+        return self.recognizer.recognize_sphinx(audio, language=self.language)
+
+
+class WhisperBackend(SpeechBackend):
+    """Local Whisper model, offline after the first download (requires openai-whisper)."""
+    name = "whisper"
+
+    def __init__(self, model="base", language="english"):
+        super().__init__()
+        self.model = model
+        self.language = language
+        self.recognizer = sr.Recognizer()
+
+    def recognize(self, audio):
+        text = self.recognizer.recognize_whisper(audio, model=self.model, language=self.language)
+        text = text.strip()
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+
+class VoskBackend(SpeechBackend):
+    """Vosk/Kaldi model from a local directory, with true incremental decoding."""
+    name = "vosk"
+
+    def __init__(self, model_path):
+        super().__init__()
+        from vosk import Model
+
+        self.model = Model(model_path)
+
+    def _recognizer(self, sample_rate):
+        from vosk import KaldiRecognizer
+
+        return KaldiRecognizer(self.model, sample_rate)
+
+    def recognize(self, audio):
+        recognizer = self._recognizer(audio.sample_rate)
+        recognizer.AcceptWaveform(audio.get_raw_data(convert_width=2))
+        text = json.loads(recognizer.FinalResult()).get("text", "")
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+    def transcribe_chunks(self, chunks, sample_rate, sample_width=2):
+        recognizer = self._recognizer(sample_rate)
+        for chunk in chunks:
+            started = time.perf_counter()
+            finished_utterance = recognizer.AcceptWaveform(chunk)
+            self._observe(len(chunk) / (sample_rate * sample_width), time.perf_counter() - started)
+            if finished_utterance:
+                text = json.loads(recognizer.Result()).get("text", "")
+                if text:
+                    yield text
+        text = json.loads(recognizer.FinalResult()).get("text", "")
+        if text:
+            yield text
+
+
+BACKENDS = {
+    "google": GoogleBackend,
+    "sphinx": SphinxBackend,
+    "whisper": WhisperBackend,
+    "vosk": VoskBackend,
+}
+
+
+def create_backend(name, **options):
+    """Instantiate the backend registered under name with backend-specific options."""
+    try:
+        backend_class = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown speech backend '{name}'. Choose from: {', '.join(BACKENDS)}")
+    return backend_class(**options)
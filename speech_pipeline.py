@@ -0,0 +1,130 @@
+"""Sentence-by-sentence speech synthesis that overlaps with reply generation.
+
+Streamed reply text is fed in as it arrives; every completed sentence is
+sent to the TTS workers straight away, so synthesis of the first sentences
+runs while the model is still writing the rest. Segments come back in reply
+order and can be joined into one clip for gapless playback.
+"""
+import io
+import re
+import threading
+import time
+import wave
+from collections import deque
+
+_SENTENCE_END = re.compile(r"(?<=[.!?…])[\"')\]]*\s+")
+
+
+class SentenceSplitter:
+    """Incrementally split streamed text into sentences."""
+
+    def __init__(self, min_chars=20):
+        self.min_chars = min_chars
+        self._pending = ""
+
+    def feed(self, text):
+        """Add text and return any sentences that are now complete."""
+        self._pending += text
+        sentences = []
+        start = 0
+        for match in _SENTENCE_END.finditer(self._pending):
+            candidate = self._pending[start:match.end()].strip()
+            # Very short fragments ("Hi.") are merged into the next sentence
+            if len(candidate) >= self.min_chars:
+                sentences.append(candidate)
+                start = match.end()
+        self._pending = self._pending[start:]
+        return sentences
+
+    def flush(self):
+        """Return whatever is left once the stream has ended."""
+        remainder, self._pending = self._pending.strip(), ""
+        return [remainder] if remainder else []
+
+
+def join_audio_segments(segments):
+    """Concatenate (bytes, mime) segments into a single (bytes, mime) clip.
+
+    WAV segments with matching formats are joined frame by frame; MP3 frames
+    can simply be concatenated.
+    """
+    if not segments:
+        return None
+    mime = segments[0][1]
+    if len(segments) == 1:
+        return segments[0]
+    if mime != "audio/wav":
+        return b"".join(data for data, _ in segments), mime
+
+    output = io.BytesIO()
+    with wave.open(output, "wb") as out:
+        for index, (data, _) in enumerate(segments):
+            with wave.open(io.BytesIO(data), "rb") as segment:
+                if index == 0:
+                    out.setparams(segment.getparams())
+                out.writeframes(segment.readframes(segment.getnframes()))
+    return output.getvalue(), mime
+
+
+class SpeechPipeline:
+    def __init__(self, tts_pool, session_id, min_chars=20, clock=time.perf_counter):
+        self.tts_pool = tts_pool
+        self.session_id = session_id
+        self.splitter = SentenceSplitter(min_chars)
+        self._clock = clock
+        self._futures = []
+        self.started_at = clock()
+        self.first_segment_at = None
+        self.audio_ready_at = None
+        self.dropped = 0
+
+        # A new reply replaces anything still queued from the previous one
+        tts_pool.cancel(session_id)
+
+    def _submit(self, sentences):
+        for sentence in sentences:
+            # Once a sentence is rejected, the rest are dropped too: a clip with a gap
+            # in the middle reads worse than one that stops early
+            future = None if self.dropped else self.tts_pool.submit(
+                sentence, session_id=self.session_id, render=True, supersede=False)
+            if future is None:
+                self.dropped += 1
+            else:
+                if not self._futures:
+                    # Timed from the worker's side, not from when segments() gets round to it
+                    future.add_done_callback(self._first_segment_done)
+                self._futures.append(future)
+
+    def _first_segment_done(self, future):
+        if not future.cancelled() and future.exception() is None:
+            self.first_segment_at = self._clock()
+
+    def feed(self, text):
+        self._submit(self.splitter.feed(text))
+
+    def finish(self):
+        self._submit(self.splitter.flush())
+
+    def segments(self, timeout=30):
+        """Yield (bytes, mime) segments in reply order as each finishes synthesizing."""
+        for future in self._futures:
+            yield future.result(timeout=timeout)
+
+    @property
+    def time_to_first_segment(self):
+        """Seconds from the start of the reply until its first sentence was synthesized."""
+        if self.first_segment_at is None:
+            return None
+        return self.first_segment_at - self.started_at
+
+    @property
+    def time_to_audio_ready(self):
+        """Seconds from the start of the reply until joined_audio() returned the whole clip."""
+        if self.audio_ready_at is None:
+            return None
+        return self.audio_ready_at - self.started_at
+
+    def joined_audio(self, timeout=30):
+        clip = join_audio_segments(list(self.segments(timeout)))
+        self.audio_ready_at = self._clock()
+        return clip
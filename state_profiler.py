@@ -0,0 +1,180 @@
+"""Memory footprint of st.session_state, per session and per worker.
+
+deep_size walks an object graph iteratively, counting each object once and
+skipping anything shared across sessions (cached clients, the model, TTS
+workers), so each session is charged only for what it holds itself. A
+FootprintRegistry keeps the latest sample for every live session in the
+process, so totals, per-key breakdowns and outliers describe the whole
+worker. suggest_compaction estimates what the common list-of-dicts
+histories would cost stored as columns.
+"""
+import statistics
+import sys
+import threading
+import time
+import types
+from collections import deque
+
+import numpy as np
+
+_ATOMS = (str, bytes, bytearray, int, float, complex, bool, type(None), range)
+_OPAQUE = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType,
+           types.CodeType, types.FrameType, threading.Thread, type(threading.Lock()), type(threading.RLock()))
+
+
+def _slot_values(obj):
+    for cls in type(obj).__mro__:
+        for name in getattr(cls, "__slots__", ()):
+            if name in ("__dict__", "__weakref__"):
+                continue
+            try:
+                yield getattr(obj, name)
+            except AttributeError:
+                pass
+
+
+def deep_size(obj, exclude_ids=(), max_objects=500_000):
+    """Approximate bytes reachable from obj, not counting objects whose id is in exclude_ids.
+
+    Gives up after max_objects objects and returns what was counted so far.
+    """
+    seen = set(exclude_ids)
+    stack = [obj]
+    total = 0
+    while stack and len(seen) < max_objects:
+        current = stack.pop()
+        if id(current) in seen:
+            continue
+        seen.add(id(current))
+        if isinstance(current, _OPAQUE):
+            continue
+        try:
+            total += sys.getsizeof(current)
+        except TypeError:
+            continue
+        if isinstance(current, _ATOMS):
+            continue
+        if isinstance(current, np.ndarray):
+            # A view's getsizeof covers only its header; the data belongs to its base
+            if current.base is not None:
+                stack.append(current.base)
+            continue
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset, deque)):
+            stack.extend(current)
+        else:
+            attributes = getattr(current, "__dict__", None)
+            if isinstance(attributes, dict):
+                stack.append(attributes)
+            stack.extend(_slot_values(current))
+    return total
+
+
+def suggest_compaction(key, value, min_items=20):
+    """A suggestion for storing a list of same-shaped dicts more compactly, or None.
+
+    Estimates the size as one list per field (or one NumPy array for
+    numeric fields), which is what MoodStore and SleepStats do.
+    """
+    if not isinstance(value, list) or len(value) < min_items:
+        return None
+    first = value[0]
+    if not isinstance(first, dict) or any(not isinstance(item, dict) or item.keys() != first.keys()
+                                          for item in value):
+        return None
+
+    columnar = 0
+    for field in first:
+        column = [item[field] for item in value]
+        if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in column):
+            columnar += np.asarray(column).nbytes + 112
+        else:
+            columnar += deep_size(column)
+    current = deep_size(value)
+    if columnar >= current * 0.8:
+        return None
+    return {
+        "key": key,
+        "items": len(value),
+        "current_bytes": current,
+        "columnar_bytes": columnar,
+        "suggestion": (f"store {key} as columns ({', '.join(first)}) "
+                       "like MoodStore, or as __slots__ records"),
+    }
+
+
+class FootprintRegistry:
+    """Latest session_state footprint of every live session in this process."""
+
+    def __init__(self, sample_every=30.0, forget_after=3600.0, outlier_factor=3.0, outlier_min_bytes=256 * 1024,
+                 clock=time.monotonic):
+        self.sample_every = sample_every
+        self.forget_after = forget_after
+        self.outlier_factor = outlier_factor
+        self.outlier_min_bytes = outlier_min_bytes
+        self._clock = clock
+        self._sessions = {}  # session id -> (sampled at, {key: bytes}, seconds spent measuring)
+        self._lock = threading.Lock()
+
+    def due(self, session_id):
+        """Whether this session has not been sampled for sample_every seconds."""
+        if self.sample_every <= 0:
+            return False
+        with self._lock:
+            sample = self._sessions.get(session_id)
+        return sample is None or self._clock() - sample[0] >= self.sample_every
+
+    def measure(self, session_id, state, exclude_ids=()):
+        """Deep-size every key of state (a mapping) and store it as this session's sample."""
+        started = time.perf_counter()
+        sizes = {str(key): deep_size(value, exclude_ids) for key, value in state.items()}
+        elapsed = time.perf_counter() - started
+        now = self._clock()
+        with self._lock:
+            self._sessions[session_id] = (now, sizes, elapsed)
+            for stale in [sid for sid, (at, _, _) in self._sessions.items() if now - at > self.forget_after]:
+                del self._sessions[stale]
+        return sizes
+
+    def session(self, session_id):
+        with self._lock:
+            sample = self._sessions.get(session_id)
+        return dict(sample[1]) if sample else {}
+
+    def _is_outlier(self, value, typical):
+        return value >= self.outlier_min_bytes and value > self.outlier_factor * typical
+
+    def stats(self):
+        with self._lock:
+            sessions = {sid: (sizes, elapsed) for sid, (_, sizes, elapsed) in self._sessions.items()}
+        if not sessions:
+            return {"sessions": 0}
+
+        totals = {sid: sum(sizes.values()) for sid, (sizes, _) in sessions.items()}
+        per_key = {}
+        for sizes, _ in sessions.values():
+            for key, size in sizes.items():
+                per_key.setdefault(key, []).append(size)
+
+        typical_total = statistics.median(totals.values())
+        outliers = [
+            {"session": sid[:8], "bytes": total}
+            for sid, total in totals.items() if self._is_outlier(total, typical_total)
+        ]
+        for sid, (sizes, _) in sessions.items():
+            for key, size in sizes.items():
+                if len(per_key[key]) > 1 and self._is_outlier(size, statistics.median(per_key[key])):
+                    outliers.append({"session": sid[:8], "key": key, "bytes": size})
+
+        return {
+            "sessions": len(sessions),
+            "worker_bytes": sum(totals.values()),
+            "median_session_bytes": typical_total,
+            "max_session_bytes": max(totals.values()),
+            "largest_keys": dict(sorted(((key, sum(sizes)) for key, sizes in per_key.items()),
+                                        key=lambda item: item[1], reverse=True)[:10]),
+            "outliers": outliers,
+            "mean_measure_ms": 1000 * statistics.fmean(elapsed for _, elapsed in sessions.values()),
+        }
@@ -0,0 +1,90 @@
+"""Incremental reply streaming from generative models.
+
+Works with anything exposing ``generate_content(prompt, stream=True)`` that
+yields chunks with a ``text`` attribute, which covers both Gemini's
+GenerativeModel and the FakeStreamingModel below.
+"""
+import time
+
+
+class StreamStats:
+    """Timings for a single streamed reply."""
+
+    def __init__(self, clock=time.perf_counter):
+        self._clock = clock
+        self.started_at = None
+        self.first_token_at = None
+        self.finished_at = None
+        self.chunks = 0
+        self.chars = 0
+
+    def start(self):
+        self.started_at = self._clock()
+
+    def record(self, text):
+        if self.first_token_at is None:
+            self.first_token_at = self._clock()
+        self.chunks += 1
+        self.chars += len(text)
+
+    def finish(self):
+        self.finished_at = self._clock()
+
+    @property
+    def time_to_first_token(self):
+        if self.started_at is None or self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started_at
+
+    @property
+    def total_time(self):
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+
+def iter_text_chunks(model, prompt, stats=None):
+    """Yield reply text piece by piece as the model produces it."""
+    stats = stats or StreamStats()
+    stats.start()
+    try:
+        for chunk in model.generate_content(prompt, stream=True):
+            try:
+                text = chunk.text
+            except ValueError:
+                # Gemini raises when a chunk carries no text (e.g. safety blocked)
+                continue
+            if not text:
+                continue
+            stats.record(text)
+            yield text
+    finally:
+        stats.finish()
+
+
+class _FakeChunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeStreamingModel:
+    """Offline stand-in for GenerativeModel that replies in small chunks."""
+
+    def __init__(self, reply=None, chunk_size=16, delay=0.05):
+        self.reply = reply or (
+            "I hear you. It sounds like a lot is on your mind right now. "
+            "Try taking a slow breath and naming one small thing you can do for yourself today."
+        )
+        self.chunk_size = chunk_size
+        self.delay = delay
+
+    def _chunks(self):
+        for i in range(0, len(self.reply), self.chunk_size):
+            if self.delay:
+                time.sleep(self.delay)
+            yield _FakeChunk(self.reply[i:i + self.chunk_size])
+
+    def generate_content(self, prompt, stream=False):
+        if stream:
+            return self._chunks()
+        return _FakeChunk(self.reply)
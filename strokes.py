@@ -0,0 +1,173 @@
+"""Compact vector logs of Art Therapy drawings.
+
+The canvas keeps the drawing in the browser and only reports back when the
+user sends it. Each report is diffed against the log by content so only
+changed strokes are converted, and strokes are stored as their kind, style and an int16
+point list rather than Fabric.js objects or an RGBA bitmap. Pixels are only
+produced on demand, when a drawing is exported or a thumbnail is needed.
+"""
+import base64
+import hashlib
+import io
+import json
+import re
+
+import numpy as np
+
+_RGBA = re.compile(r"rgba?\(\s*([\d.]+)\s*,\s*([\d.]+)\s*,\s*([\d.]+)\s*(?:,\s*([\d.]+)\s*)?\)")
+
+
+def parse_color(color):
+    """RGBA tuple for "#rrggbb", "rgb(...)" or "rgba(..., alpha 0-1)"; None for no colour."""
+    if not color or color == "transparent":
+        return None
+    match = _RGBA.fullmatch(color.strip())
+    if match:
+        r, g, b, a = match.groups()
+        return int(float(r)), int(float(g)), int(float(b)), int(255 * float(a if a is not None else 1))
+    color = color.lstrip("#")
+    if len(color) == 3:
+        color = "".join(c * 2 for c in color)
+    return int(color[0:2], 16), int(color[2:4], 16), int(color[4:6], 16), 255
+
+
+class Stroke:
+    __slots__ = ("kind", "color", "width", "fill", "points")
+
+    def __init__(self, kind, color, width, fill, points):
+        self.kind = kind
+        self.color = color
+        self.width = width
+        self.fill = fill
+        self.points = points  # int16 array of x0, y0, x1, y1, ...
+
+    @classmethod
+    def from_fabric(cls, obj):
+        """Convert one Fabric.js object from the canvas; None for kinds we do not draw."""
+        kind = obj.get("type")
+        left, top = obj.get("left", 0), obj.get("top", 0)
+        if kind == "path":
+            # Freehand paths are M/Q/L commands whose coordinates are the pointer samples
+            coords = [value for command in obj.get("path", []) for value in command[1:]]
+        elif kind == "line":
+            cx, cy = left + obj.get("width", 0) / 2, top + obj.get("height", 0) / 2
+            coords = [cx + obj["x1"], cy + obj["y1"], cx + obj["x2"], cy + obj["y2"]]
+        elif kind == "rect":
+            width = obj.get("width", 0) * obj.get("scaleX", 1)
+            height = obj.get("height", 0) * obj.get("scaleY", 1)
+            coords = [left, top, left + width, top + height]
+        elif kind == "circle":
+            radius = obj.get("radius", 0) * obj.get("scaleX", 1)
+            coords = [left, top, left + 2 * radius, top + 2 * radius]
+        else:
+            return None
+        points = np.clip(np.round(coords), -32768, 32767).astype(np.int16)
+        return cls(kind, obj.get("stroke") or "#000000", int(obj.get("strokeWidth", 1)), obj.get("fill"), points)
+
+    def to_record(self):
+        return {
+            "kind": self.kind,
+            "color": self.color,
+            "width": self.width,
+            "fill": self.fill,
+            "points": base64.b64encode(self.points.astype("<i2").tobytes()).decode("ascii"),
+        }
+
+    @classmethod
+    def from_record(cls, record):
+        points = np.frombuffer(base64.b64decode(record["points"]), dtype="<i2").astype(np.int16)
+        return cls(record["kind"], record["color"], record["width"], record.get("fill"), points)
+
+
+class StrokeLog:
+    def __init__(self, width=600, height=400, background="#FFFFFF"):
+        self.width = width
+        self.height = height
+        self.background = background
+        self.strokes = []
+        # (fingerprint, len(strokes) after it) for each canvas object converted so far
+        self._seen = []
+        self.version = 0
+
+    @staticmethod
+    def _fingerprint(obj):
+        return hashlib.blake2b(json.dumps(obj, sort_keys=True).encode(), digest_size=8).digest()
+
+    def sync(self, objects):
+        """Bring the log in line with the canvas's object list; returns the number of new strokes.
+
+        Several edits (draws, undos, redraws) can happen between two sends,
+        so objects are compared by content: everything from the first one
+        that differs from what was seen is converted again.
+        """
+        fingerprints = [self._fingerprint(obj) for obj in objects]
+        keep = 0
+        while keep < min(len(fingerprints), len(self._seen)) and fingerprints[keep] == self._seen[keep][0]:
+            keep += 1
+        if keep == len(fingerprints) == len(self._seen):
+            return 0
+
+        del self._seen[keep:]
+        del self.strokes[self._seen[-1][1] if self._seen else 0:]
+        added = 0
+        for obj, fingerprint in zip(objects[keep:], fingerprints[keep:]):
+            stroke = Stroke.from_fabric(obj)
+            if stroke is not None:
+                self.strokes.append(stroke)
+                added += 1
+            self._seen.append((fingerprint, len(self.strokes)))
+        self.version += 1
+        return added
+
+    def __len__(self):
+        return len(self.strokes)
+
+    def clear(self):
+        self.strokes = []
+        self._seen = []
+        self.version += 1
+
+    def rasterize(self, scale=1.0):
+        """Render the strokes to a PIL RGB image."""
+        from PIL import Image, ImageDraw
+
+        size = (max(1, round(self.width * scale)), max(1, round(self.height * scale)))
+        image = Image.new("RGB", size, parse_color(self.background)[:3])
+        draw = ImageDraw.Draw(image, "RGBA")
+        for stroke in self.strokes:
+            xy = [tuple(p) for p in (stroke.points.reshape(-1, 2) * scale).tolist()]
+            if not xy:
+                continue
+            color = parse_color(stroke.color)
+            width = max(1, round(stroke.width * scale))
+            if stroke.kind in ("path", "line"):
+                if len(xy) == 1:
+                    xy = xy * 2
+                draw.line(xy, fill=color, width=width, joint="curve")
+            else:
+                (x0, y0), (x1, y1) = xy
+                box = [min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1)]
+                shape = draw.rectangle if stroke.kind == "rect" else draw.ellipse
+                shape(box, fill=parse_color(stroke.fill), outline=color, width=width)
+        return image
+
+    def png(self, max_size=None):
+        """PNG bytes of the drawing, scaled down to fit max_size pixels if given."""
+        scale = 1.0 if max_size is None else min(1.0, max_size / max(self.width, self.height))
+        output = io.BytesIO()
+        self.rasterize(scale).save(output, "PNG", optimize=True)
+        return output.getvalue()
+
+    def to_records(self):
+        return {
+            "width": self.width,
+            "height": self.height,
+            "background": self.background,
+            "strokes": [stroke.to_record() for stroke in self.strokes],
+        }
+
+    @classmethod
+    def from_records(cls, records):
+        log = cls(records["width"], records["height"], records["background"])
+        log.strokes = [Stroke.from_record(record) for record in records["strokes"]]
+        return log
@@ -0,0 +1,69 @@
+import pytest
+
+from accounts import AccountError, AccountStore
+from user_store import SQLiteBackend, UserStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = UserStore(SQLiteBackend(str(tmp_path / "user_state.db")), flush_interval=60)
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def accounts(store, clock):
+    # A cheap scrypt cost keeps the tests fast
+    return AccountStore(store, max_failures=3, lockout_seconds=10, scrypt_n=2 ** 8, clock=clock)
+
+
+def test_same_passphrase_gives_separate_accounts(accounts):
+    alice = accounts.register("alice", "correct horse")
+    bob = accounts.register("bob", "correct horse")
+    assert alice != bob
+    assert accounts.sign_in(" Alice ", "correct horse") == alice
+
+
+def test_names_are_unique(accounts):
+    accounts.register("alice", "correct horse")
+    with pytest.raises(AccountError):
+        accounts.register("ALICE", "another passphrase")
+
+
+def test_wrong_passphrase_and_unknown_name_are_rejected(accounts):
+    accounts.register("alice", "correct horse")
+    with pytest.raises(AccountError):
+        accounts.sign_in("alice", "wrong horse")
+    with pytest.raises(AccountError):
+        accounts.sign_in("nobody", "correct horse")
+
+
+def test_repeated_failures_lock_the_name(accounts, clock):
+    user_id = accounts.register("alice", "correct horse")
+    for _ in range(3):
+        with pytest.raises(AccountError):
+            accounts.sign_in("alice", "guess")
+    with pytest.raises(AccountError, match="Too many attempts"):
+        accounts.sign_in("alice", "correct horse")
+    clock.now = 10
+    assert accounts.sign_in("alice", "correct horse") == user_id
+
+
+def test_only_a_verifier_is_stored(accounts, store):
+    accounts.register("alice", "correct horse")
+    record = store.get("account:alice", "credentials")
+    assert "correct horse" not in str(record)
+    assert set(record) == {"user_id", "salt", "verifier"}
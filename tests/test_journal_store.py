@@ -0,0 +1,65 @@
+import pytest
+
+from journal_store import JournalStore
+
+
+@pytest.fixture(params=["fts", "index"])
+def store(request, monkeypatch):
+    if request.param == "index":
+        # Exercise the inverted-index fallback used when SQLite has no FTS5
+        monkeypatch.setattr(JournalStore, "_create_fts", lambda self: False)
+    store = JournalStore(":memory:")
+    if request.param == "fts" and not store.uses_fts:
+        pytest.skip("this SQLite build has no FTS5")
+    yield store
+    store.close()
+
+
+def bodies(rows):
+    return [body for _, _, body in rows]
+
+
+def test_search_requires_every_word_and_matches_a_prefix(store):
+    store.add("u1", "Walked by the river and felt calm")
+    store.add("u1", "Work was stressful today")
+    store.add("u1", "Calm morning with tea")
+    rows, total = store.search("u1", "calm riv")
+    assert total == 1
+    assert bodies(rows) == ["Walked by the river and felt calm"]
+    assert store.search("u1", "calm")[1] == 2
+
+
+def test_users_only_see_their_own_entries(store):
+    store.add("u1", "my private thoughts")
+    store.add("u2", "someone else's thoughts")
+    assert bodies(store.search("u1", "thoughts")[0]) == ["my private thoughts"]
+    assert store.count("u2") == 1
+
+
+def test_deleted_entries_leave_the_index(store):
+    entry_id = store.add("u1", "gratitude for friends")
+    store.delete("u1", entry_id)
+    assert store.search("u1", "gratitude") == ([], 0)
+    store.add("u1", "gratitude again")
+    store.clear("u1")
+    assert store.search("u1", "gratitude") == ([], 0)
+
+
+def test_pages_walk_back_from_the_newest_entry(store):
+    for n in range(25):
+        store.add("u1", f"entry {n}")
+    seen, cursor = [], None
+    while True:
+        rows, cursor = store.page("u1", cursor=cursor, limit=10)
+        seen.extend(bodies(rows))
+        if cursor is None:
+            break
+    assert seen == [f"entry {n}" for n in reversed(range(25))]
+
+
+def test_search_results_page_by_position(store):
+    for n in range(12):
+        store.add("u1", f"calm day {n}")
+    first, cursor = store.page("u1", "calm", limit=10)
+    second, last = store.page("u1", "calm", cursor=cursor, limit=10)
+    assert len(first) == 10 and len(second) == 2 and last is None
@@ -0,0 +1,50 @@
+import socket
+import time
+
+import pytest
+
+from meme_prefetch import MemePrefetcher, MemeUnavailable, StubMemeServer
+
+
+@pytest.fixture
+def server():
+    with StubMemeServer() as server:
+        yield server
+
+
+def test_clicks_are_served_from_the_buffer(server):
+    prefetcher = MemePrefetcher(f"{server.url}/gimme", buffer_size=3)
+    try:
+        first = prefetcher.get(timeout=5)
+        assert first.image_url.startswith(server.url)
+        time.sleep(0.3)
+        started = time.perf_counter()
+        prefetcher.get(timeout=5)
+        assert time.perf_counter() - started < 0.1
+        stats = prefetcher.stats()
+        assert stats["served_from_buffer"] >= 1
+        assert stats["requests"] < stats["fetched"] + 1  # batched
+    finally:
+        prefetcher.shutdown()
+
+
+def test_slow_prepare_does_not_hold_back_the_batch(server):
+    prefetcher = MemePrefetcher(f"{server.url}/gimme", buffer_size=5, prepare=lambda meme: time.sleep(2))
+    try:
+        started = time.perf_counter()
+        prefetcher.get(timeout=5)
+        assert time.perf_counter() - started < 1.5
+    finally:
+        prefetcher.shutdown()
+
+
+def test_unreachable_api_is_reported(tmp_path):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    prefetcher = MemePrefetcher(f"http://127.0.0.1:{port}/gimme", timeout=1)
+    try:
+        with pytest.raises(MemeUnavailable):
+            prefetcher.get(timeout=5)
+    finally:
+        prefetcher.shutdown()
@@ -0,0 +1,165 @@
+import asyncio
+import time
+
+import pytest
+
+from model_client import (AsyncModelClient, CircuitBreaker, CircuitOpenError, HttpProvider, ModelTimeoutError,
+                          Provider, StubModelServer)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class ScriptedProvider(Provider):
+    """Raises the queued errors in turn, then answers (or streams) normally."""
+    name = "scripted"
+
+    def __init__(self, errors=(), stream_delay=0.0):
+        self.errors = list(errors)
+        self.stream_delay = stream_delay
+        self.calls = 0
+
+    async def generate(self, prompt):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "reply"
+
+    async def stream(self, prompt):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        yield "first "
+        await asyncio.sleep(self.stream_delay)
+        yield "second"
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def make_client():
+    clients = []
+
+    def make(provider, **kwargs):
+        kwargs.setdefault("backoff_base", 0.001)
+        client = AsyncModelClient(provider, **kwargs)
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        client.close()
+
+
+def test_breaker_opens_after_threshold_and_lets_one_trial_through(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=10, clock=clock)
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    clock.now = 10
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()  # only one trial at a time
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_failed_trial_reopens_the_breaker(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=10, clock=clock)
+    breaker.record_failure()
+    clock.now = 10
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.trips == 2
+
+
+def test_released_trial_can_be_retried(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=10, clock=clock)
+    breaker.record_failure()
+    clock.now = 10
+    assert breaker.allow()
+    breaker.release_trial()
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+
+
+def test_retries_transient_failures_from_stub_server(make_client):
+    with StubModelServer(reply="hello", fail_first=2) as server:
+        client = make_client(HttpProvider(server.url), retries=3)
+        assert client.generate("hi") == "hello"
+        assert server.requests == 3
+        assert client.retried == 2
+        assert client.breaker.state == "closed"
+
+
+def test_deadline_bounds_total_time(make_client):
+    with StubModelServer(delay=1.0) as server:
+        client = make_client(HttpProvider(server.url), timeout=0.2, deadline=0.5, retries=10)
+        started = time.monotonic()
+        with pytest.raises(ModelTimeoutError):
+            client.generate("hi")
+        assert time.monotonic() - started < 1.5
+
+
+def test_circuit_rejects_calls_once_open(make_client, clock):
+    provider = ScriptedProvider([ConnectionError("down")] * 2)
+    client = make_client(provider, retries=0, breaker=CircuitBreaker(failure_threshold=2, clock=clock))
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            client.generate("hi")
+    with pytest.raises(CircuitOpenError):
+        client.generate("hi")
+    assert provider.calls == 2
+    assert client.rejected == 1
+
+
+def test_non_retryable_errors_do_not_open_the_circuit(make_client, clock):
+    # e.g. Gemini's ValueError for a safety-blocked reply
+    provider = ScriptedProvider([ValueError("blocked")] * 5)
+    client = make_client(provider, retries=3, breaker=CircuitBreaker(failure_threshold=2, clock=clock))
+    for _ in range(5):
+        with pytest.raises(ValueError):
+            client.generate("hi")
+    assert provider.calls == 5  # not retried either
+    assert client.breaker.state == "closed"
+    assert client.generate("hi") == "reply"
+
+
+def test_stream_yields_chunks_in_order(make_client):
+    client = make_client(ScriptedProvider())
+    assert "".join(client.stream("hi")) == "first second"
+    assert client.breaker.state == "closed"
+
+
+def test_cancelled_trial_stream_releases_the_breaker(make_client, clock):
+    provider = ScriptedProvider([ConnectionError("down")], stream_delay=5.0)
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=10, clock=clock)
+    client = make_client(provider, retries=0, breaker=breaker)
+    with pytest.raises(ConnectionError):
+        list(client.stream("hi"))
+    assert breaker.state == "open"
+
+    clock.now = 10
+    chunks = client.stream("hi")
+    assert next(chunks) == "first "
+    chunks.close()  # the reader goes away mid-stream, as on a rerun
+
+    deadline = time.monotonic() + 2
+    while breaker._trial_in_flight and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not breaker._trial_in_flight
+    provider.stream_delay = 0
+    assert "".join(client.stream("hi")) == "first second"
+    assert breaker.state == "closed"
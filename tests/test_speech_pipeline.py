@@ -0,0 +1,48 @@
+from concurrent.futures import Future
+
+from speech_pipeline import SentenceSplitter, SpeechPipeline
+
+
+class FakePool:
+    """Renders instantly; rejects the submissions whose (1-based) numbers are in reject."""
+
+    def __init__(self, reject=()):
+        self.reject = set(reject)
+        self.submitted = []
+
+    def cancel(self, session_id):
+        pass
+
+    def submit(self, text, session_id="default", render=False, supersede=True):
+        self.submitted.append(text)
+        if len(self.submitted) in self.reject:
+            return None
+        future = Future()
+        future.set_result((text.encode(), "audio/mpeg"))
+        return future
+
+
+def test_splitter_emits_complete_sentences_as_they_arrive():
+    splitter = SentenceSplitter(min_chars=10)
+    assert splitter.feed("Hi. This is the first") == []
+    assert splitter.feed(" sentence. And the") == ["Hi. This is the first sentence."]
+    assert splitter.flush() == ["And the"]
+
+
+def test_segments_are_joined_in_reply_order():
+    pipeline = SpeechPipeline(FakePool(), "s", min_chars=5)
+    pipeline.feed("One sentence. Two sentence. ")
+    pipeline.feed("Three")
+    pipeline.finish()
+    assert pipeline.joined_audio() == (b"One sentence.Two sentence.Three", "audio/mpeg")
+    assert pipeline.time_to_first_segment is not None
+
+
+def test_speech_stops_at_the_first_rejected_sentence():
+    pool = FakePool(reject={2})
+    pipeline = SpeechPipeline(pool, "s", min_chars=5)
+    pipeline.feed("One sentence. Two sentence. Three sentence. ")
+    pipeline.finish()
+    assert pipeline.joined_audio() == (b"One sentence.", "audio/mpeg")
+    assert pipeline.dropped == 2
+    assert len(pool.submitted) == 2  # nothing is submitted after the rejection
@@ -0,0 +1,26 @@
+from streaming import FakeStreamingModel, StreamStats, iter_text_chunks
+
+
+class BlockedChunk:
+    @property
+    def text(self):
+        raise ValueError("blocked")
+
+
+class PartlyBlockedModel(FakeStreamingModel):
+    def _chunks(self):
+        yield BlockedChunk()
+        yield from super()._chunks()
+
+
+def test_chunks_rebuild_the_reply_and_record_timings():
+    model = FakeStreamingModel(reply="Take a slow breath.", chunk_size=4, delay=0.01)
+    stats = StreamStats()
+    assert "".join(iter_text_chunks(model, "hi", stats)) == "Take a slow breath."
+    assert stats.chunks == 5
+    assert 0 < stats.time_to_first_token <= stats.total_time
+
+
+def test_blocked_chunks_are_skipped():
+    model = PartlyBlockedModel(reply="Still here.", delay=0)
+    assert "".join(iter_text_chunks(model, "hi")) == "Still here."
@@ -0,0 +1,62 @@
+from strokes import Stroke, StrokeLog
+
+
+def line(x):
+    return {"type": "line", "left": 0, "top": 0, "width": 0, "height": 0,
+            "x1": x, "y1": 0, "x2": x + 1, "y2": 1, "stroke": "#000000", "strokeWidth": 2}
+
+
+def starts(log):
+    return [int(stroke.points[0]) for stroke in log.strokes]
+
+
+def test_new_objects_are_appended():
+    log = StrokeLog()
+    assert log.sync([line(1)]) == 1
+    assert log.sync([line(1), line(2)]) == 1
+    assert starts(log) == [1, 2]
+
+
+def test_unchanged_objects_do_not_bump_the_version():
+    log = StrokeLog()
+    log.sync([line(1)])
+    version = log.version
+    assert log.sync([line(1)]) == 0
+    assert log.version == version
+
+
+def test_undo_then_redraw_between_sends():
+    log = StrokeLog()
+    log.sync([line(1), line(2)])
+    # Same length: p2 undone, p3 drawn
+    log.sync([line(1), line(3)])
+    assert starts(log) == [1, 3]
+    # Longer: p3 undone, p4 and p5 drawn
+    log.sync([line(1), line(4), line(5)])
+    assert starts(log) == [1, 4, 5]
+
+
+def test_unsupported_objects_keep_stroke_positions_aligned():
+    log = StrokeLog()
+    log.sync([line(1), {"type": "text"}, line(2)])
+    log.sync([line(1), {"type": "text"}, line(3)])
+    assert starts(log) == [1, 3]
+
+
+def test_clearing_the_canvas_empties_the_log():
+    log = StrokeLog()
+    log.sync([line(1), line(2)])
+    log.sync([])
+    assert len(log) == 0
+
+
+def test_records_round_trip():
+    log = StrokeLog(width=300, height=200)
+    log.sync([line(1), {"type": "rect", "left": 5, "top": 6, "width": 10, "height": 20, "stroke": "#ff0000",
+                        "fill": "rgba(0, 0, 255, 0.5)"}])
+    restored = StrokeLog.from_records(log.to_records())
+    assert (restored.width, restored.height) == (300, 200)
+    assert [s.kind for s in restored.strokes] == ["line", "rect"]
+    assert restored.strokes[1].points.tolist() == [5, 6, 15, 26]
+    assert restored.strokes[1].fill == "rgba(0, 0, 255, 0.5)"
+    assert isinstance(restored.strokes[0], Stroke)
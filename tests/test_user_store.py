@@ -0,0 +1,91 @@
+import pytest
+
+from user_store import SQLiteBackend, UserStore
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "user_state.db")
+
+
+@pytest.fixture
+def store(db_path):
+    # A long interval, so tests decide when flushes happen
+    store = UserStore(SQLiteBackend(db_path), flush_interval=60)
+    yield store
+    store.close()
+
+
+def test_reads_see_pending_writes(store):
+    store.put("u1", "mood", [1, 2])
+    assert store.get("u1", "mood") == [1, 2]
+    assert store.get("u2", "mood") is None
+    assert store.stats()["pending"] == 1
+
+
+def test_values_are_copied_when_put(store):
+    value = {"count": 1}
+    store.put("u1", "meme_counter", value)
+    value["count"] = 2
+    assert store.get("u1", "meme_counter") == {"count": 1}
+
+
+def test_writes_to_one_key_are_coalesced(store):
+    for count in range(5):
+        store.put("u1", "meme_counter", count)
+    assert store.flush() == 1
+    stats = store.stats()
+    assert stats["coalesced"] == 4
+    assert stats["rows_flushed"] == 1
+
+
+def test_flushed_data_survives_a_new_store(store, db_path):
+    store.put("u1", "sleep", {"nights": 3})
+    store.put("u1", "gone", 1)
+    store.flush()
+    store.delete("u1", "gone")
+    store.close()
+
+    reopened = UserStore(SQLiteBackend(db_path), flush_interval=60)
+    try:
+        assert reopened.get("u1", "sleep") == {"nights": 3}
+        assert reopened.get("u1", "gone") is None
+    finally:
+        reopened.close()
+
+
+def test_deleted_keys_read_as_missing_before_flush(store):
+    store.put("u1", "game", {"board": []})
+    store.flush()
+    store.delete("u1", "game")
+    assert store.get("u1", "game", "default") == "default"
+
+
+class FlakyBackend(SQLiteBackend):
+    def __init__(self, path):
+        super().__init__(path)
+        self.fail = True
+
+    def put_many(self, items, deletes=()):
+        if self.fail:
+            raise OSError("disk full")
+        super().put_many(items, deletes)
+
+
+def test_failed_flush_is_requeued_without_losing_newer_writes(db_path):
+    backend = FlakyBackend(db_path)
+    store = UserStore(backend, flush_interval=60)
+    try:
+        store.put("u1", "a", 1)
+        with pytest.raises(OSError):
+            store.flush()
+        store.put("u1", "b", 2)
+        assert store.get("u1", "a") == 1
+
+        backend.fail = False
+        assert store.flush() == 2
+        assert backend.get("u1", "a") is not None
+        assert backend.get("u1", "b") is not None
+    finally:
+        backend.fail = False
+        store.close()
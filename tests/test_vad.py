@@ -0,0 +1,65 @@
+import os
+
+import numpy as np
+import pytest
+
+from audio_capture import AudioCapture, SyntheticSource, read_wav_samples
+from vad import EndpointDetector, speech_segments, trim_silence
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_RATE = 16000
+
+
+def tone(seconds, amplitude=0.3, freq=220):
+    t = np.arange(int(seconds * SAMPLE_RATE), dtype=np.float32) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def hiss(seconds, level=1e-4, seed=0):
+    return np.random.default_rng(seed).normal(0, level, int(seconds * SAMPLE_RATE)).astype(np.float32)
+
+
+@pytest.mark.parametrize("name", ["user_input.wav", "recorded_audio.wav"])
+def test_bundled_recordings_keep_their_speech(name):
+    samples, sample_rate = read_wav_samples(os.path.join(ROOT, name))
+    segments = speech_segments(samples, sample_rate)
+    trimmed = trim_silence(samples, sample_rate)
+    assert segments
+    assert 0 < len(trimmed) <= len(samples)
+
+
+def test_leading_and_trailing_silence_is_trimmed():
+    clip = np.concatenate([hiss(1.0), tone(1.0), hiss(1.0, seed=1)])
+    trimmed = trim_silence(clip, SAMPLE_RATE, pad_ms=150)
+    # The tone, 150 ms of padding either side and the 240 ms hangover
+    assert 1.0 <= len(trimmed) / SAMPLE_RATE <= 1.7
+
+
+def test_speech_filling_the_clip_is_not_trimmed_away():
+    # The user talks right up to Stop or the length cap
+    clip = np.concatenate([hiss(0.2), tone(4.8)])
+    segments = speech_segments(clip, SAMPLE_RATE)
+    assert len(segments) == 1
+    assert segments[0][0] < 0.3 * SAMPLE_RATE
+    assert len(trim_silence(clip, SAMPLE_RATE)) >= 4.8 * SAMPLE_RATE
+
+
+def test_default_synthetic_tone_survives_trimming():
+    source = SyntheticSource()
+    assert len(trim_silence(source.samples, source.sample_rate)) == len(source.samples)
+
+
+def test_silence_has_no_speech():
+    assert len(trim_silence(hiss(2.0), SAMPLE_RATE)) == 0
+
+
+def test_endpoint_detector_ends_capture_after_speech():
+    clip = np.concatenate([hiss(0.5), tone(1.0), hiss(3.0, seed=1)])
+    source = SyntheticSource(clip, sample_rate=SAMPLE_RATE, realtime=False)
+    capture = AudioCapture(source, max_seconds=10)
+    capture.listeners.append(EndpointDetector(SAMPLE_RATE, end_silence_ms=600))
+    capture.start()
+    assert capture.wait(timeout=5)
+    capture.stop()
+    assert capture.stop_reason == "listener"
+    assert capture.duration < 3.0
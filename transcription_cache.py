@@ -0,0 +1,115 @@
+"""Transcription cache keyed on the audio payload rather than a filename.
+
+The key is a BLAKE2b digest of the WAV format parameters and PCM frames, so
+the same clip hits the cache wherever it came from and a new recording can
+never be served a stale transcript. Entries live in a bounded in-memory LRU
+and can optionally be persisted as small JSON files in a directory.
+"""
+import hashlib
+import json
+import os
+import threading
+import wave
+from collections import OrderedDict
+
+
+def audio_fingerprint(audio_source):
+    """Hex digest of a WAV file path or file-like object's format and PCM frames."""
+    if hasattr(audio_source, "seek"):
+        audio_source.seek(0)
+    with wave.open(audio_source, 'rb') as wf:
+        params = f"{wf.getnchannels()}:{wf.getsampwidth()}:{wf.getframerate()}"
+        frames = wf.readframes(wf.getnframes())
+    if hasattr(audio_source, "seek"):
+        audio_source.seek(0)
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(params.encode())
+    digest.update(frames)
+    return digest.hexdigest()
+
+
+class TranscriptionCache:
+    def __init__(self, max_entries=512, persist_dir=None):
+        self.max_entries = max_entries
+        self.persist_dir = persist_dir
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if persist_dir:
+            os.makedirs(persist_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.persist_dir, f"{key}.json")
+
+    def _load(self, key):
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                return json.load(f)["text"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _store(self, key, text):
+        path = self._path(key)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"text": text}, f)
+        os.replace(tmp_path, path)
+
+    def _insert(self, key, text):
+        self._entries[key] = text
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            self.evictions += 1
+            if self.persist_dir:
+                try:
+                    os.remove(self._path(evicted))
+                except OSError:
+                    pass
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+            text = self._load(key) if self.persist_dir else None
+            if text is None:
+                self.misses += 1
+                return None
+
+            self.disk_hits += 1
+            self._insert(key, text)
+            return text
+
+    def put(self, key, text):
+        with self._lock:
+            self._insert(key, text)
+            if self.persist_dir:
+                try:
+                    self._store(key, text)
+                except OSError:
+                    pass  # persistence is best effort; the memory copy is still valid
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            "persistent": bool(self.persist_dir),
+        }
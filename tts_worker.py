@@ -0,0 +1,190 @@
+"""Dedicated text-to-speech workers with a bounded job queue.
+
+pyttsx3 engines are not thread-safe, so each worker thread builds and owns
+its own synthesizer and is the only thread that ever touches it. Jobs are
+queued per session: submitting a new reply for a session cancels that
+session's older jobs that have not started yet, so stale replies are never
+spoken and never hold a queue slot. When the queue is full, submit()
+refuses the job rather than piling up threads.
+"""
+import io
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+
+class Pyttsx3Synthesizer:
+    """Offline synthesis with pyttsx3; can play on the server or render WAV bytes."""
+
+    def __init__(self, rate=150, volume=0.8):
+        import pyttsx3
+
+        self.engine = pyttsx3.init()
+        self.engine.setProperty("rate", rate)  # Adjust speaking rate
+        self.engine.setProperty("volume", volume)  # Set volume
+
+    def speak(self, text):
+        self.engine.say(text)
+        self.engine.runAndWait()
+
+    def render(self, text):
+        fd, path = tempfile.mkstemp(suffix=".wav")
+        os.close(fd)
+        try:
+            self.engine.save_to_file(text, path)
+            self.engine.runAndWait()
+            with open(path, "rb") as f:
+                return f.read(), "audio/wav"
+        finally:
+            os.remove(path)
+
+
+class GTTSSynthesizer:
+    """Google Translate TTS; renders MP3 bytes for playback in the browser."""
+
+    def __init__(self, lang="en"):
+        self.lang = lang
+
+    def speak(self, text):
+        raise NotImplementedError("gTTS can only render audio for the browser")
+
+    def render(self, text):
+        from gtts import gTTS
+
+        buffer = io.BytesIO()
+        gTTS(text=text, lang=self.lang).write_to_fp(buffer)
+        return buffer.getvalue(), "audio/mp3"
+
+
+class TTSJob:
+    def __init__(self, text, session_id, render):
+        self.text = text
+        self.session_id = session_id
+        self.render = render
+        self.future = Future()
+        self.submitted_at = time.perf_counter()
+
+
+class TTSWorkerPool:
+    def __init__(self, synthesizer_factory, workers=1, max_queue=8):
+        self._factory = synthesizer_factory
+        self._jobs = deque()
+        self._max_queue = max_queue
+        self._lock = threading.Lock()
+        self._has_jobs = threading.Condition(self._lock)
+        self._stopping = False
+
+        self.submitted = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.rejected = 0
+        self.failed = 0
+        self.max_depth = 0
+        self._wait_seconds = 0.0
+        self._synth_seconds = 0.0
+
+        self._threads = [
+            threading.Thread(target=self._run, name=f"tts-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _cancel_pending(self, session_id):
+        # Caller holds the lock
+        stale = [job for job in self._jobs if job.session_id == session_id]
+        for job in stale:
+            self._jobs.remove(job)
+            job.future.cancel()
+        self.cancelled += len(stale)
+
+    def submit(self, text, session_id="default", render=False, supersede=True):
+        """Queue text for synthesis and return a Future, or None if the queue is full.
+
+        The future resolves to None for spoken jobs and to (audio_bytes, mime)
+        for rendered ones. With supersede=True, the session's older queued
+        jobs are cancelled first.
+        """
+        with self._lock:
+            if supersede:
+                self._cancel_pending(session_id)
+            if len(self._jobs) >= self._max_queue:
+                self.rejected += 1
+                return None
+
+            job = TTSJob(text, session_id, render)
+            self._jobs.append(job)
+            self.submitted += 1
+            self.max_depth = max(self.max_depth, len(self._jobs))
+            self._has_jobs.notify()
+        return job.future
+
+    def cancel(self, session_id):
+        """Cancel every job for session_id that has not started yet."""
+        with self._lock:
+            self._cancel_pending(session_id)
+
+    def _next_job(self):
+        with self._lock:
+            while not self._jobs and not self._stopping:
+                self._has_jobs.wait()
+            if self._stopping:
+                return None
+            return self._jobs.popleft()
+
+    def _run(self):
+        synthesizer = None
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            if not job.future.set_running_or_notify_cancel():
+                continue
+
+            started = time.perf_counter()
+            try:
+                if synthesizer is None:
+                    synthesizer = self._factory()
+                if job.render:
+                    result = synthesizer.render(job.text)
+                else:
+                    synthesizer.speak(job.text)
+                    result = None
+            except Exception as e:
+                with self._lock:
+                    self.failed += 1
+                job.future.set_exception(e)
+                continue
+
+            finished = time.perf_counter()
+            with self._lock:
+                self.completed += 1
+                self._wait_seconds += started - job.submitted_at
+                self._synth_seconds += finished - started
+            job.future.set_result(result)
+
+    def shutdown(self):
+        with self._lock:
+            self._stopping = True
+            self._has_jobs.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=1)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": len(self._threads),
+                "queue_depth": len(self._jobs),
+                "queue_capacity": self._max_queue,
+                "max_depth": self.max_depth,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "cancelled": self.cancelled,
+                "rejected": self.rejected,
+                "failed": self.failed,
+                "mean_wait_ms": 1000 * self._wait_seconds / self.completed if self.completed else 0.0,
+                "mean_synthesis_ms": 1000 * self._synth_seconds / self.completed if self.completed else 0.0,
+            }
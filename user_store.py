@@ -0,0 +1,172 @@
+"""Per-user key-value storage with write-behind batching.
+
+Tracker data is saved under (user_id, key) as JSON. Writes go to an
+in-memory pending map and a background thread flushes them to the backend
+in one transaction every flush_interval seconds (sooner once max_pending
+keys are waiting). Repeated writes to the same key between flushes are
+coalesced, so saving on every rerun costs one row write per interval.
+Reads check pending writes first, so a session always sees its own saves.
+
+The default backend is a local SQLite file; anything with the same
+get/put_many methods (e.g. a shared database) can be dropped in so
+sessions resume on any replica.
+"""
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+
+_DELETED = object()
+
+
+class SQLiteBackend:
+    def __init__(self, path="data/user_state.db"):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS kv (
+                    user_id TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (user_id, key)
+                ) WITHOUT ROWID""")
+
+    def get(self, user_id, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM kv WHERE user_id = ? AND key = ?", (user_id, key)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put_many(self, items, deletes=()):
+        """Write {(user_id, key): value} and delete [(user_id, key)] in one transaction."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO kv (user_id, key, value, updated_at) VALUES (?, ?, ?, ?)",
+                [(user_id, key, value, now) for (user_id, key), value in items.items()],
+            )
+            self._conn.executemany("DELETE FROM kv WHERE user_id = ? AND key = ?", list(deletes))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class UserStore:
+    def __init__(self, backend, flush_interval=2.0, max_pending=200):
+        self.backend = backend
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending = {}
+        self._inflight = {}  # batch currently being written
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._flush_lock = threading.Lock()
+        self._stopping = False
+        self._writes = 0
+        self._coalesced = 0
+        self._flushes = 0
+        self._rows_flushed = 0
+        self._last_flush_seconds = 0.0
+        self._last_error = None
+
+        self._thread = threading.Thread(target=self._run, name="user-store-flusher", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def get(self, user_id, key, default=None):
+        with self._lock:
+            pending = self._pending.get((user_id, key), self._inflight.get((user_id, key)))
+        if pending is _DELETED:
+            return default
+        value = pending if pending is not None else self.backend.get(user_id, key)
+        return default if value is None else json.loads(value)
+
+    def put(self, user_id, key, value):
+        """Queue value (anything JSON-serializable) for writing.
+
+        It is serialized immediately, so later changes to the caller's object
+        do not leak into the saved copy.
+        """
+        self._enqueue(user_id, key, json.dumps(value, separators=(",", ":")))
+
+    def delete(self, user_id, key):
+        self._enqueue(user_id, key, _DELETED)
+
+    def _enqueue(self, user_id, key, value):
+        with self._lock:
+            if (user_id, key) in self._pending:
+                self._coalesced += 1
+            self._pending[(user_id, key)] = value
+            self._writes += 1
+            if len(self._pending) >= self.max_pending:
+                self._wake.notify()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._stopping:
+                    self._wake.wait(self.flush_interval)
+                stopping = self._stopping
+            try:
+                self.flush()
+            except Exception as e:
+                # The batch was put back; keep the flusher alive and retry next interval
+                self._last_error = repr(e)
+            if stopping:
+                return
+
+    def flush(self):
+        """Write all pending changes now. Safe to call from any thread."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                self._inflight = batch
+            if not batch:
+                return 0
+            started = time.perf_counter()
+            items = {k: v for k, v in batch.items() if v is not _DELETED}
+            deletes = [k for k, v in batch.items() if v is _DELETED]
+            try:
+                self.backend.put_many(items, deletes)
+            except Exception:
+                # Put the batch back, without clobbering anything written since
+                with self._lock:
+                    self._pending = {**batch, **self._pending}
+                    self._inflight = {}
+                raise
+            with self._lock:
+                self._inflight = {}
+                self._flushes += 1
+                self._rows_flushed += len(batch)
+                self._last_flush_seconds = time.perf_counter() - started
+            return len(batch)
+
+    def close(self):
+        with self._lock:
+            if self._stopping:
+                return
+            self._stopping = True
+            self._wake.notify_all()
+        self._thread.join(timeout=5)
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pending": len(self._pending),
+                "writes": self._writes,
+                "coalesced": self._coalesced,
+                "flushes": self._flushes,
+                "rows_flushed": self._rows_flushed,
+                "last_flush_ms": 1000 * self._last_flush_seconds,
+                "last_error": self._last_error,
+            }
@@ -0,0 +1,158 @@
+"""Energy-based voice activity detection.
+
+Works on float32 mono samples in [-1, 1]. The batch functions are fully
+vectorized over fixed-size frames; EndpointDetector applies the same idea
+incrementally to a live capture so it can stop once the speaker goes quiet.
+
+Run ``python vad.py [wav ...]`` to benchmark against the sample recordings.
+"""
+import sys
+import time
+
+import numpy as np
+
+
+def frame_energy_db(samples, sample_rate, frame_ms=30):
+    """RMS level of each non-overlapping frame in dBFS."""
+    frame_len = max(1, int(sample_rate * frame_ms / 1000))
+    n_frames = len(samples) // frame_len
+    if n_frames == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = np.asarray(samples[:n_frames * frame_len], dtype=np.float32).reshape(n_frames, frame_len)
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10))
+
+
+def adaptive_threshold_db(energy_db, margin_db=12.0, floor_db=-55.0):
+    """Speech threshold a fixed margin above the estimated noise floor.
+
+    When speech fills most of the clip, the "noise floor" is itself speech,
+    so the threshold is also kept at least margin_db below the loudest frame.
+    """
+    if len(energy_db) == 0:
+        return floor_db
+    noise_floor = np.percentile(energy_db, 10)
+    peak = np.max(energy_db)
+    return max(min(noise_floor + margin_db, peak - margin_db), floor_db)
+
+
+def speech_mask(samples, sample_rate, frame_ms=30, threshold_db=None, min_speech_ms=90, hangover_ms=240):
+    """Per-frame boolean mask of where speech is present."""
+    energy = frame_energy_db(samples, sample_rate, frame_ms)
+    if threshold_db is None:
+        threshold_db = adaptive_threshold_db(energy)
+    mask = energy > threshold_db
+
+    # Drop bursts shorter than min_speech_ms (clicks, pops)
+    min_frames = max(1, int(min_speech_ms / frame_ms))
+    starts, ends = _runs(mask)
+    for start, end in zip(starts, ends):
+        if end - start < min_frames:
+            mask[start:end] = False
+
+    # Hold speech for hangover_ms after it ends so word gaps are not cut
+    hangover = int(hangover_ms / frame_ms)
+    if hangover and mask.any():
+        mask = np.convolve(mask.astype(np.int8), np.ones(hangover + 1, dtype=np.int8))[:len(mask)] > 0
+    return mask
+
+
+def _runs(mask):
+    """Start and end (exclusive) frame indices of each run of True values."""
+    padded = np.concatenate(([False], mask, [False])).astype(np.int8)
+    edges = np.diff(padded)
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def speech_segments(samples, sample_rate, frame_ms=30, **kwargs):
+    """List of (start_sample, end_sample) spans that contain speech."""
+    mask = speech_mask(samples, sample_rate, frame_ms, **kwargs)
+    frame_len = max(1, int(sample_rate * frame_ms / 1000))
+    starts, ends = _runs(mask)
+    return [(int(s) * frame_len, min(int(e) * frame_len, len(samples))) for s, e in zip(starts, ends)]
+
+
+def trim_silence(samples, sample_rate, pad_ms=150, **kwargs):
+    """Cut leading and trailing silence, keeping pad_ms either side of the speech.
+
+    Returns an empty array when no speech is found.
+    """
+    segments = speech_segments(samples, sample_rate, **kwargs)
+    if not segments:
+        return samples[:0]
+    pad = int(sample_rate * pad_ms / 1000)
+    start = max(0, segments[0][0] - pad)
+    end = min(len(samples), segments[-1][1] + pad)
+    return samples[start:end]
+
+
+class EndpointDetector:
+    """Streaming end-of-utterance detector for use as an AudioCapture listener.
+
+    The first calibration_ms of audio sets the noise floor. Once speech has
+    been heard, end_silence_ms of continuous silence ends the capture.
+    """
+
+    def __init__(self, sample_rate, frame_ms=30, margin_db=12.0, floor_db=-55.0,
+                 calibration_ms=300, end_silence_ms=1200):
+        self.sample_rate = sample_rate
+        self.frame_ms = frame_ms
+        self.frame_len = max(1, int(sample_rate * frame_ms / 1000))
+        self.margin_db = margin_db
+        self.floor_db = floor_db
+        self.calibration_frames = max(1, int(calibration_ms / frame_ms))
+        self.end_silence_frames = max(1, int(end_silence_ms / frame_ms))
+
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._calibration = []
+        self.threshold_db = None
+        self.speech_started = False
+        self._silent_frames = 0
+
+    def __call__(self, frames):
+        """Feed new samples; returns False once the utterance has ended."""
+        self._pending = np.concatenate((self._pending, np.asarray(frames, dtype=np.float32)))
+        usable = len(self._pending) - len(self._pending) % self.frame_len
+        if not usable:
+            return True
+        energy = frame_energy_db(self._pending[:usable], self.sample_rate, self.frame_ms)
+        self._pending = self._pending[usable:]
+
+        if self.threshold_db is None:
+            self._calibration.extend(energy.tolist())
+            if len(self._calibration) < self.calibration_frames:
+                return True
+            noise_floor = float(np.median(self._calibration))
+            self.threshold_db = max(noise_floor + self.margin_db, self.floor_db)
+            energy = np.asarray(self._calibration[self.calibration_frames:], dtype=np.float32)
+
+        for is_speech in energy > self.threshold_db:
+            if is_speech:
+                self.speech_started = True
+                self._silent_frames = 0
+            elif self.speech_started:
+                self._silent_frames += 1
+                if self._silent_frames >= self.end_silence_frames:
+                    return False
+        return True
+
+
+def _benchmark(paths, repeats=20):
+    from audio_capture import read_wav_samples
+
+    for path in paths:
+        samples, sample_rate = read_wav_samples(path)
+        started = time.perf_counter()
+        for _ in range(repeats):
+            trimmed = trim_silence(samples, sample_rate)
+        elapsed = (time.perf_counter() - started) / repeats
+        segments = speech_segments(samples, sample_rate)
+        duration = len(samples) / sample_rate
+        print(f"{path}: {duration:.2f}s audio, {len(segments)} speech segment(s), "
+              f"trimmed to {len(trimmed) / sample_rate:.2f}s "
+              f"({100 * (1 - len(trimmed) / max(len(samples), 1)):.0f}% fewer bytes), "
+              f"{elapsed * 1000:.2f} ms per pass ({duration / elapsed:.0f}x real time)")
+
+
+if __name__ == "__main__":
+    _benchmark(sys.argv[1:] or ["user_input.wav", "recorded_audio.wav"])